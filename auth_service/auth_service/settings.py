@@ -39,6 +39,8 @@ ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', '1234')
 ADMIN_GROUP_NAME = os.environ.get('ADMIN_GROUP_NAME', 'Administration')
 
 SERVER_API_KEY = os.environ.get('SERVER_API_KEY', '123')
+# Shared with the services that verify access tokens locally
+JWT_SIGNING_KEY = os.environ.get('JWT_SIGNING_KEY') or SECRET_KEY
 
 METRICS_SERVICE_HOST = os.environ.get('METRICS_SERVICE_HOST', '127.0.0.1')
 METRICS_SERVICE_PORT = os.environ.get('METRICS_SERVICE_PORT', '8002')
@@ -104,11 +106,13 @@ DATABASES = {
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=365),
+    'ALGORITHM': 'HS256',
+    'SIGNING_KEY': JWT_SIGNING_KEY,
 }
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.RevocationAwareJWTAuthentication',
     ]
 }
 
@@ -1,18 +1,19 @@
-import requests
-
 from auth_service.settings import METRICS_SERVICE_PORT, METRICS_SERVICE_HOST
+from common.service_client import ServiceClient
 
 METRICS_SERVICE_URL = f'http://{METRICS_SERVICE_HOST}:{METRICS_SERVICE_PORT}'
 
+metrics_client = ServiceClient('metrics', METRICS_SERVICE_URL)
+
 
 def get_structure():
-    response = requests.get(url=f'{METRICS_SERVICE_URL}/metrics/structure/')
+    response = metrics_client.get('/metrics/structure/')
     return response.json()
 
 
 def delete_metrics_user(headers, user_id):
     headers = {'Authorization': headers['Authorization']}
-    response = requests.delete(url=f'{METRICS_SERVICE_URL}/metrics/responsible_users/users/{user_id}/', headers=headers)
+    response = metrics_client.delete(f'/metrics/responsible_users/users/{user_id}/', headers=headers)
     if response.status_code == 200:
         return True
     else:
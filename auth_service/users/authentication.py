@@ -0,0 +1,19 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from users.tokens import get_revoked_before
+
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    """
+    Rejects access tokens issued before the user last logged out, the same
+    rule the other services apply to their local token verification.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if 'iat' in validated_token:
+            revoked_before = get_revoked_before(user.id)
+            if revoked_before and validated_token['iat'] < revoked_before.timestamp():
+                raise InvalidToken('Token has been revoked')
+        return user
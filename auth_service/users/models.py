@@ -5,6 +5,7 @@ from typing import List
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.db import models, transaction
+from django.utils import timezone
 
 from users.utils import generate_secret_key, generate_expiration_date
 from utils import AbstractCreateUpdateModel
@@ -110,3 +111,8 @@ class ContactInfo(AbstractCreateUpdateModel):
     type = models.CharField(max_length=255)
     value = models.CharField(max_length=255)
     notes = models.CharField(max_length=255)
+
+    def delete(self, *args, **kwargs):
+        # Bumps the owner so the user change feed picks up the removed contact info
+        User.objects.filter(id=self.user_id).update(updated=timezone.now())
+        return super().delete(*args, **kwargs)
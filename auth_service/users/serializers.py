@@ -2,10 +2,13 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
-from rest_framework_simplejwt.serializers import login_rule, user_eligible_for_login, PasswordField
+from rest_framework_simplejwt.serializers import login_rule, user_eligible_for_login, PasswordField, \
+    TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from users.models import User, Invite, UserGroup, ContactInfo
+from users.tokens import get_user_permissions, add_user_claims
 from utils import DefaultSerializer
 
 
@@ -33,15 +36,25 @@ class UserSerializer(serializers.ModelSerializer):
             return None
 
     def get_permissions(self, obj):
-        permissions = set()
-        for user_group in obj.user_groups.all():
-            permissions.update(set(user_group.permissions))
-        return list(permissions)
+        return get_user_permissions(obj)
 
     def validate_password(self, value: str) -> str:
         return make_password(value)
 
 
+class UserBriefSerializer(serializers.ModelSerializer):
+    contact_infos = ContactInfoSerializer(many=True)
+
+    class Meta:
+        model = User
+        fields = ('id', 'email', 'first_name', 'last_name', 'contact_infos')
+
+
+class UserChangeSerializer(UserBriefSerializer):
+    class Meta(UserBriefSerializer.Meta):
+        fields = UserBriefSerializer.Meta.fields + ('updated',)
+
+
 class UserPartSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -106,7 +119,7 @@ class UserWithTokenSerializer(DefaultSerializer):
 
     @classmethod
     def get_token(cls, user) -> RefreshToken:
-        return RefreshToken.for_user(user)
+        return add_user_claims(RefreshToken.for_user(user), user)
 
     def validate(self, attrs):
         authenticate_kwargs = {
@@ -134,6 +147,24 @@ class UserWithTokenSerializer(DefaultSerializer):
         return data
 
 
+class PermissionsTokenRefreshSerializer(TokenRefreshSerializer):
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}).first()
+        if not user:
+            raise AuthenticationFailed()
+
+        # Permissions may have changed since login, so the new access token carries the current ones
+        access = add_user_claims(refresh.access_token, user)
+        return {'access': str(access)}
+
+
+class TokenRevocationSerializer(DefaultSerializer):
+    user_id = serializers.IntegerField()
+    revoked_before = serializers.FloatField()
+
+
 class UserGroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserGroup
@@ -162,6 +193,12 @@ class AddUserGroupAdminSerializer(DefaultSerializer):
     user_id = serializers.IntegerField(required=True)
 
 
+class UserChangesQuerySerializer(DefaultSerializer):
+    since = serializers.DateTimeField(required=False)
+    since_id = serializers.IntegerField(required=False, default=0)
+    limit = serializers.IntegerField(required=False, default=500, min_value=1, max_value=1000)
+
+
 class UserGroupsQuerySerializer(DefaultSerializer):
     user_id = serializers.IntegerField(required=False)
     administrated = serializers.IntegerField(required=False)
@@ -171,3 +208,4 @@ class UserGroupsQuerySerializer(DefaultSerializer):
 class UserListQuerySerializer(DefaultSerializer):
     user_group_id = serializers.IntegerField(required=False)
     only_admins = serializers.IntegerField(required=False)
+    ids = serializers.CharField(required=False, help_text='Comma separated ids, returns brief users without paging')
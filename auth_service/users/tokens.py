@@ -0,0 +1,41 @@
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from users.models import User
+
+
+def get_user_permissions(user: User) -> List[str]:
+    permissions = set()
+    for user_group in user.user_groups.all():
+        permissions.update(set(user_group.permissions))
+    return sorted(permissions)
+
+
+def add_user_claims(token, user: User):
+    token['permissions'] = get_user_permissions(user)
+    # Compared against blacklisted_at, so it keeps the same sub-second precision: a token issued right after a logout
+    # in the same second is still valid
+    token['iat'] = time.time()
+    return token
+
+
+def get_revoked_before(user_id: int) -> Optional[datetime]:
+    # LogoutView blacklists every outstanding refresh token of the user, so a logout ends all of their sessions and
+    # revocations are tracked per user rather than per token
+    blacklisted = BlacklistedToken.objects.filter(token__user_id=user_id)
+    return blacklisted.aggregate(revoked_before=Max('blacklisted_at'))['revoked_before']
+
+
+def get_recent_revocations():
+    # Revocations older than the access token lifetime cannot affect any token that is still valid
+    cutoff = timezone.now() - api_settings.ACCESS_TOKEN_LIFETIME
+    return BlacklistedToken.objects.filter(blacklisted_at__gte=cutoff) \
+        .values('token__user_id') \
+        .annotate(revoked_before=Max('blacklisted_at')) \
+        .order_by('token__user_id')
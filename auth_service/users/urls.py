@@ -7,6 +7,8 @@ urlpatterns = [
     path('<int:user_id>/', SingleUserView.as_view(), name='Get user'),
     path('change-password/', ChangeUserPasswordView.as_view(), name='Change user password'),
     path('auth-user/', get_user_info, name='Get user by token'),
+    path('revocations/', get_token_revocations, name='Get recent token revocations'),
+    path('changes/', get_user_changes, name='Get users changed since a cursor'),
     path('add-user/', add_user, name='Add user'),
 
     path('invites/', get_all_created_invitations, name='Get all invited which user has made'),
@@ -1,5 +1,6 @@
 from django.contrib.auth.hashers import make_password
 from django.db import IntegrityError
+from django.db.models import Q
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
@@ -19,10 +20,14 @@ from users.models import User, Invite, UserGroup, ContactInfo
 from users.serializers import UserSerializer, UserWithTokenSerializer, AddUserSerializer, InviteSerializer, \
     AddUserToGroupSerializer, UserGroupSerializer, CreateUserGroupSerializer, AddUserGroupAdminSerializer, \
     PatchUserSerializer, UserGroupsQuerySerializer, ChangeUserPasswordSerializer, UserListQuerySerializer, \
-    ChangeUserGroupSerializer
+    ChangeUserGroupSerializer, PermissionsTokenRefreshSerializer, TokenRevocationSerializer, UserBriefSerializer, \
+    UserChangeSerializer, UserChangesQuerySerializer
+from users.tokens import get_recent_revocations
 from users.utils import generate_random_email, generate_random_password, is_in_parent_group, is_admin_of_parent_group
 from utils import paginate, make_pagination_serializer
 
+MAX_USER_IDS = 500
+
 
 @permission_classes([IsAuthenticated])
 class LogoutView(APIView):
@@ -118,7 +123,7 @@ class ChangeUserPasswordView(APIView):
         return Response(data={})
 
 
-@permission_classes([IsAuthenticated])
+@permission_classes([IsAuthenticated | ServerApiKeyAuthorized])
 class GetAllUsersView(APIView):
 
     @swagger_auto_schema(responses={'200': make_pagination_serializer(UserSerializer)},
@@ -126,6 +131,17 @@ class GetAllUsersView(APIView):
     def get(self, request, *args, **kwargs):
         query = None
         query_params = {k: v[0] for k, v in dict(request.query_params).items()}
+        if ids := query_params.pop('ids', None):
+            try:
+                ids = [int(user_id) for user_id in ids.split(',')]
+            except ValueError:
+                return Response(data={'detail': 'ids must be comma separated integers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if len(ids) > MAX_USER_IDS:
+                return Response(data={'detail': f'At most {MAX_USER_IDS} ids can be requested at once'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            users = User.objects.filter(id__in=ids).prefetch_related('contact_infos')
+            return Response(UserBriefSerializer(users, many=True).data)
         if user_group_id := query_params.pop('user_group_id', None):
             user_group = UserGroup.objects.filter(id=user_group_id).first()
             if not user_group:
@@ -147,6 +163,10 @@ class LoginView(TokenViewBase):
     serializer_class = UserWithTokenSerializer
 
 
+class TokenRefreshView(TokenViewBase):
+    serializer_class = PermissionsTokenRefreshSerializer
+
+
 class GetByInviteView(RetrieveModelMixin, GenericViewSet):
     serializer_class = InviteSerializer
     permission_classes = (AllowAny,)
@@ -329,6 +349,33 @@ def get_user_info(request: Request, *args, **kwargs):
     return Response(ser.data)
 
 
+@swagger_auto_schema(method='GET', query_serializer=UserChangesQuerySerializer,
+                     responses={'200': UserChangeSerializer(many=True)})
+@api_view(['GET'])
+@permission_classes([ServerApiKeyAuthorized])
+def get_user_changes(request: Request, *args, **kwargs):
+    query_serializer = UserChangesQuerySerializer(data=request.query_params)
+    query_serializer.is_valid(raise_exception=True)
+    since = query_serializer.validated_data.get('since')
+    since_id = query_serializer.validated_data['since_id']
+    limit = query_serializer.validated_data['limit']
+
+    users = User.objects.all()
+    if since:
+        users = users.filter(Q(updated__gt=since) | Q(updated=since, id__gt=since_id))
+    users = users.order_by('updated', 'id').prefetch_related('contact_infos')[:limit]
+    return Response(UserChangeSerializer(users, many=True).data)
+
+
+@swagger_auto_schema(method='GET', responses={'200': TokenRevocationSerializer(many=True)})
+@api_view(['GET'])
+@permission_classes([ServerApiKeyAuthorized])
+def get_token_revocations(request: Request, *args, **kwargs):
+    revocations = [{'user_id': revocation['token__user_id'], 'revoked_before': revocation['revoked_before'].timestamp()}
+                   for revocation in get_recent_revocations()]
+    return Response(TokenRevocationSerializer(revocations, many=True).data)
+
+
 @swagger_auto_schema(method='GET', responses={'200': make_pagination_serializer(InviteSerializer)})
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
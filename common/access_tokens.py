@@ -0,0 +1,67 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """Latest logout time per user, fetched from the auth service at most once every refresh_interval seconds"""
+
+    def __init__(self, auth_client, server_api_key: str, refresh_interval: float):
+        self.auth_client = auth_client
+        self.server_api_key = server_api_key
+        self.refresh_interval = refresh_interval
+        self._revoked_before: Dict[int, float] = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        response = self.auth_client.get('/users/revocations/', headers={'Server-Api-Key': self.server_api_key})
+        response.raise_for_status()
+        self._revoked_before = {revocation['user_id']: revocation['revoked_before'] for revocation in response.json()}
+
+    def revoked_before(self, user_id: int) -> Optional[float]:
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_interval:
+            with self._lock:
+                if self._refreshed_at is None or time.monotonic() - self._refreshed_at > self.refresh_interval:
+                    try:
+                        self._refresh()
+                    except (requests.RequestException, ValueError):
+                        # Keep serving the last known list rather than rejecting every token
+                        logger.warning('Failed to refresh the token revocation list', exc_info=True)
+                    self._refreshed_at = time.monotonic()
+        return self._revoked_before.get(user_id)
+
+
+class AccessTokenVerifier:
+    """
+    Verifies access tokens with the key the auth service signs them with. Tokens issued before their user last logged
+    out are revoked, the same rule the auth service applies.
+    """
+
+    def __init__(self, auth_client, server_api_key: str, signing_key: str, algorithm: str,
+                 revocation_refresh_interval: float):
+        self.signing_key = signing_key
+        self.algorithm = algorithm
+        self.revocation_list = RevocationList(auth_client, server_api_key, revocation_refresh_interval)
+
+    def decode(self, authorization: str) -> Optional[Dict[str, Any]]:
+        scheme, _, token = authorization.partition(' ')
+        if scheme != 'Bearer' or not token:
+            return None
+        try:
+            claims = jwt.decode(token, self.signing_key, algorithms=[self.algorithm])
+        except jwt.InvalidTokenError:
+            return None
+        if claims.get('token_type') != 'access':
+            return None
+        return claims
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        revoked_before = self.revocation_list.revoked_before(claims['user_id'])
+        return bool(revoked_before) and claims.get('iat', 0) < revoked_before
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SERVICE_CLIENT_POOL_SIZE = int(os.environ.get('SERVICE_CLIENT_POOL_SIZE', 20))
+SERVICE_CLIENT_CONNECT_TIMEOUT = float(os.environ.get('SERVICE_CLIENT_CONNECT_TIMEOUT', 2))
+SERVICE_CLIENT_READ_TIMEOUT = float(os.environ.get('SERVICE_CLIENT_READ_TIMEOUT', 10))
+SERVICE_CLIENT_RETRIES = int(os.environ.get('SERVICE_CLIENT_RETRIES', 3))
+SERVICE_CLIENT_BACKOFF_FACTOR = float(os.environ.get('SERVICE_CLIENT_BACKOFF_FACTOR', 0.2))
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class ServiceClient:
+    """
+    Keep-alive HTTP client for calls to another service. Idempotent requests
+    are retried with exponential backoff on connection errors and 502/503/504.
+    """
+
+    def __init__(self, name: str, base_url: str, pool_size: int = SERVICE_CLIENT_POOL_SIZE,
+                 timeout: Timeout = (SERVICE_CLIENT_CONNECT_TIMEOUT, SERVICE_CLIENT_READ_TIMEOUT),
+                 retries: int = SERVICE_CLIENT_RETRIES, backoff_factor: float = SERVICE_CLIENT_BACKOFF_FACTOR):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(502, 503, 504),
+                              raise_on_status=False),
+        )
+        self._session = requests.Session()
+        self._session.mount('http://', self._adapter)
+        self._session.mount('https://', self._adapter)
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+        clients[name] = self
+
+    def request(self, method: str, path: str, timeout: Optional[Timeout] = None, **kwargs) -> requests.Response:
+        started = time.monotonic()
+        try:
+            return self._session.request(method, f'{self.base_url}{path}', timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            latency = time.monotonic() - started
+            with self._lock:
+                self.calls += 1
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        pools = self._adapter.poolmanager.pools
+        connections = 0
+        requests_sent = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            'base_url': self.base_url,
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_latency_ms': self.total_latency * 1000 / self.calls if self.calls else 0.0,
+            'max_latency_ms': self.max_latency * 1000,
+            'connections_opened': connections,
+            'requests_sent': requests_sent,
+            'connection_reuse_ratio': 1 - connections / requests_sent if requests_sent else 0.0,
+        }
+
+
+clients: Dict[str, ServiceClient] = {}
+
+
+def service_client_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: client.stats() for name, client in clients.items()}
@@ -1,15 +1,19 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
-import requests
 from pydantic import BaseModel
 
-from document_service.settings import AUTH_SERVICE_HOST, AUTH_SERVICE_PORT
+from common.access_tokens import AccessTokenVerifier
+from common.service_client import ServiceClient
+from document_service.settings import AUTH_SERVICE_HOST, AUTH_SERVICE_PORT, JWT_SIGNING_KEY, JWT_ALGORITHM, \
+    REVOCATION_REFRESH_INTERVAL
 
 AUTH_API_URL = f"http://{AUTH_SERVICE_HOST}:{AUTH_SERVICE_PORT}"
 
 SERVER_API_KEY = os.environ.get('SERVER_API_KEY', '123')
 
+auth_client = ServiceClient('auth', AUTH_API_URL)
+
 
 class UserModel(BaseModel):
     id: int
@@ -19,25 +23,46 @@ class UserModel(BaseModel):
     permissions: List[str]
 
 
+class TokenUserModel(BaseModel):
+    id: int
+    permissions: List[str]
+
+
+# Tokens are verified locally only when the key is set, otherwise every token goes through the auth service
+token_verifier = AccessTokenVerifier(auth_client, SERVER_API_KEY, JWT_SIGNING_KEY, JWT_ALGORITHM,
+                                     REVOCATION_REFRESH_INTERVAL) if JWT_SIGNING_KEY else None
+
+
+def get_request_user(headers: Dict[str, str]) -> Optional[Union[UserModel, TokenUserModel]]:
+    authorization = headers.get('Authorization')
+    if not authorization:
+        return None
+    if token_verifier:
+        claims = token_verifier.decode(authorization)
+        if claims is None:
+            return None
+        # Tokens issued before the permission claims were introduced are still checked by the auth service
+        if 'permissions' in claims:
+            if token_verifier.is_revoked(claims):
+                return None
+            return TokenUserModel(id=claims['user_id'], permissions=claims['permissions'])
+
+    response = auth_client.get('/users/auth-user/', headers={'Authorization': authorization})
+    if response.status_code != 200:
+        return None
+    return UserModel(**response.json())
+
+
 def auth_user(headers: Dict[str, str]) -> bool:
     if os.environ.get('DEBUG') == 'True':
         return True
-    response = requests.get(url=f'{AUTH_API_URL}/users/auth-user/',
-                            headers={k.capitalize(): v for k, v in headers.items()})
-    return response.status_code == 200
-
-
-def get_request_user(headers: Dict[str, str]) -> UserModel:
-    response = requests.get(url=f'{AUTH_API_URL}/users/auth-user/',
-                            headers={k.capitalize(): v for k, v in headers.items()})
-    user = UserModel(**response.json())
-    return user
+    return get_request_user(headers) is not None
 
 
 def has_permission(headers: Dict[str, str], permission_name: str) -> bool:
     if os.environ.get('DEBUG') == 'True':
         return True
     user = get_request_user(headers)
-    if permission_name not in user.permissions:
+    if not user or permission_name not in user.permissions:
         return False
     return True
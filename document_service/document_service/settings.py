@@ -35,6 +35,10 @@ SERVER_API_KEY = os.environ.get('SERVER_API_KEY', '123')
 
 AUTH_SERVICE_HOST = os.environ.get('AUTH_SERVICE_HOST', '127.0.0.1')
 AUTH_SERVICE_PORT = os.environ.get('AUTH_SERVICE_PORT', '8001')
+# When set, access tokens are verified locally with the key the auth service signs them with
+JWT_SIGNING_KEY = os.environ.get('JWT_SIGNING_KEY')
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
+REVOCATION_REFRESH_INTERVAL = float(os.environ.get('REVOCATION_REFRESH_INTERVAL', 30))
 
 # custom settings end
 
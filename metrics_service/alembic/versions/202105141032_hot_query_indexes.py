@@ -0,0 +1,59 @@
+"""hot_query_indexes
+
+Revision ID: 5f1c2a9e7d43
+Revises: 04f776f46cd2
+Create Date: 2021-05-14 10:32:47.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1c2a9e7d43'
+down_revision = '04f776f46cd2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_buildings_building_type_id'), 'buildings', ['building_type_id'], unique=False)
+    op.create_index(op.f('ix_buildings_location_id'), 'buildings', ['location_id'], unique=False)
+    op.create_index(op.f('ix_electric_equipment_room_id'), 'electric_equipment', ['room_id'], unique=False)
+    op.create_index('ix_environmental_readings_room_id_current_time', 'environmental_readings',
+                    ['room_id', 'current_time'], unique=False)
+    op.create_index(op.f('ix_floor_items_floor_id'), 'floor_items', ['floor_id'], unique=False)
+    op.create_index(op.f('ix_floors_building_id'), 'floors', ['building_id'], unique=False)
+    op.create_index(op.f('ix_heating_batteries_room_id'), 'heating_batteries', ['room_id'], unique=False)
+    op.create_index('ix_meter_snapshots_meter_id_creation_date', 'meter_snapshots', ['meter_id', 'creation_date'],
+                    unique=False)
+    op.create_index('ix_meter_snapshots_meter_id_current_time', 'meter_snapshots', ['meter_id', 'current_time'],
+                    unique=False)
+    op.create_index(op.f('ix_meters_building_id'), 'meters', ['building_id'], unique=False)
+    op.create_index(op.f('ix_meters_recognition_key'), 'meters', ['recognition_key'], unique=True)
+    op.create_index(op.f('ix_meters_secret_key'), 'meters', ['secret_key'], unique=True)
+    op.create_index(op.f('ix_responsible_users_building_id'), 'responsible_users', ['building_id'], unique=False)
+    op.create_index(op.f('ix_responsible_users_user_id'), 'responsible_users', ['user_id'], unique=False)
+    op.create_index(op.f('ix_rooms_floor_id'), 'rooms', ['floor_id'], unique=False)
+    op.create_index(op.f('ix_water_equipment_room_id'), 'water_equipment', ['room_id'], unique=False)
+    op.create_index(op.f('ix_windows_room_id'), 'windows', ['room_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_windows_room_id'), table_name='windows')
+    op.drop_index(op.f('ix_water_equipment_room_id'), table_name='water_equipment')
+    op.drop_index(op.f('ix_rooms_floor_id'), table_name='rooms')
+    op.drop_index(op.f('ix_responsible_users_user_id'), table_name='responsible_users')
+    op.drop_index(op.f('ix_responsible_users_building_id'), table_name='responsible_users')
+    op.drop_index(op.f('ix_meters_secret_key'), table_name='meters')
+    op.drop_index(op.f('ix_meters_recognition_key'), table_name='meters')
+    op.drop_index(op.f('ix_meters_building_id'), table_name='meters')
+    op.drop_index('ix_meter_snapshots_meter_id_current_time', table_name='meter_snapshots')
+    op.drop_index('ix_meter_snapshots_meter_id_creation_date', table_name='meter_snapshots')
+    op.drop_index(op.f('ix_heating_batteries_room_id'), table_name='heating_batteries')
+    op.drop_index(op.f('ix_floors_building_id'), table_name='floors')
+    op.drop_index(op.f('ix_floor_items_floor_id'), table_name='floor_items')
+    op.drop_index('ix_environmental_readings_room_id_current_time', table_name='environmental_readings')
+    op.drop_index(op.f('ix_electric_equipment_room_id'), table_name='electric_equipment')
+    op.drop_index(op.f('ix_buildings_location_id'), table_name='buildings')
+    op.drop_index(op.f('ix_buildings_building_type_id'), table_name='buildings')
@@ -0,0 +1,145 @@
+"""time_partitioning
+
+Revision ID: 9c4e7b21d0a6
+Revises: 5f1c2a9e7d43
+Create Date: 2021-05-14 14:05:12.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7b21d0a6'
+down_revision = '5f1c2a9e7d43'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+METER_SNAPSHOTS_COLUMNS = '''
+    meter_id INTEGER NOT NULL REFERENCES meters (id) ON DELETE CASCADE,
+    type metertype NOT NULL,
+    consumption NUMERIC NOT NULL,
+    automatic BOOLEAN NOT NULL,
+    creation_date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    "current_time" TIMESTAMP WITHOUT TIME ZONE,
+    uptime NUMERIC
+'''
+METER_SNAPSHOTS_COLUMN_NAMES = 'id, meter_id, type, consumption, automatic, creation_date, "current_time", uptime'
+
+ENVIRONMENTAL_READINGS_COLUMNS = '''
+    room_id INTEGER NOT NULL REFERENCES rooms (id) ON DELETE CASCADE,
+    automatic BOOLEAN,
+    "current_time" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    temperature NUMERIC,
+    humidity NUMERIC,
+    notes VARCHAR(255)
+'''
+ENVIRONMENTAL_READINGS_COLUMN_NAMES = 'id, room_id, automatic, "current_time", temperature, humidity, notes'
+
+SNAPSHOT_DETAIL_TABLES = ('heat_meter_snapshots', 'electricity_meter_snapshots')
+
+
+def _replace_table(table, columns, column_names, primary_key, partition_by=None):
+    op.execute(f'ALTER TABLE {table} RENAME TO {table}_old')
+    op.execute(f'ALTER TABLE {table}_old RENAME CONSTRAINT {table}_pkey TO {table}_old_pkey')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY NONE')
+    op.execute(f'''
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'),
+            {columns},
+            CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})
+        ) {f"PARTITION BY RANGE ({partition_by})" if partition_by else ""}
+    ''')
+    if partition_by:
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        op.execute(f'''
+            SELECT create_monthly_partition('{table}', month::date)
+            FROM (SELECT DISTINCT date_trunc('month', {partition_by}) AS month FROM {table}_old) AS months
+        ''')
+        op.execute(f'''
+            SELECT create_monthly_partition('{table}', (date_trunc('month', now()) + n * interval '1 month')::date)
+            FROM generate_series(0, {MONTHS_AHEAD}) AS n
+        ''')
+    op.execute(f'INSERT INTO {table} ({column_names}) SELECT {column_names} FROM {table}_old')
+    op.execute(f'DROP TABLE {table}_old')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+
+def upgrade():
+    op.execute('''
+        CREATE OR REPLACE FUNCTION create_monthly_partition(parent_table TEXT, month DATE) RETURNS TEXT AS $$
+        DECLARE
+            partition_start DATE := date_trunc('month', month);
+            partition_name TEXT := parent_table || '_p' || to_char(partition_start, 'YYYYMM');
+        BEGIN
+            IF to_regclass(partition_name) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, parent_table, partition_start, partition_start + interval '1 month');
+            END IF;
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+    op.execute('''
+        UPDATE meter_snapshots SET creation_date = coalesce("current_time", now() at time zone 'utc')
+        WHERE creation_date IS NULL
+    ''')
+    for detail_table in SNAPSHOT_DETAIL_TABLES:
+        op.drop_constraint(f'{detail_table}_snapshot_id_fkey', detail_table, type_='foreignkey')
+    op.drop_index('ix_meter_snapshots_meter_id_creation_date', table_name='meter_snapshots')
+    op.drop_index('ix_meter_snapshots_meter_id_current_time', table_name='meter_snapshots')
+    _replace_table('meter_snapshots', METER_SNAPSHOTS_COLUMNS, METER_SNAPSHOTS_COLUMN_NAMES,
+                   primary_key='id, creation_date', partition_by='creation_date')
+    op.create_index('ix_meter_snapshots_meter_id_creation_date', 'meter_snapshots', ['meter_id', 'creation_date'],
+                    unique=False)
+    op.create_index('ix_meter_snapshots_meter_id_current_time', 'meter_snapshots', ['meter_id', 'current_time'],
+                    unique=False)
+
+    # Partitioned tables cannot be referenced by snapshot_id alone, so the detail rows are removed by a trigger
+    op.execute('''
+        CREATE OR REPLACE FUNCTION delete_meter_snapshot_details() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM heat_meter_snapshots WHERE snapshot_id = OLD.id;
+            DELETE FROM electricity_meter_snapshots WHERE snapshot_id = OLD.id;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    op.execute('''
+        CREATE TRIGGER meter_snapshots_delete_details AFTER DELETE ON meter_snapshots
+        FOR EACH ROW EXECUTE FUNCTION delete_meter_snapshot_details()
+    ''')
+
+    op.drop_index('ix_environmental_readings_room_id_current_time', table_name='environmental_readings')
+    _replace_table('environmental_readings', ENVIRONMENTAL_READINGS_COLUMNS, ENVIRONMENTAL_READINGS_COLUMN_NAMES,
+                   primary_key='id, "current_time"', partition_by='"current_time"')
+    op.create_index('ix_environmental_readings_room_id_current_time', 'environmental_readings',
+                    ['room_id', 'current_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_environmental_readings_room_id_current_time', table_name='environmental_readings')
+    _replace_table('environmental_readings', ENVIRONMENTAL_READINGS_COLUMNS, ENVIRONMENTAL_READINGS_COLUMN_NAMES,
+                   primary_key='id')
+    op.create_index('ix_environmental_readings_room_id_current_time', 'environmental_readings',
+                    ['room_id', 'current_time'], unique=False)
+
+    op.execute('DROP TRIGGER meter_snapshots_delete_details ON meter_snapshots')
+    op.execute('DROP FUNCTION delete_meter_snapshot_details()')
+    op.drop_index('ix_meter_snapshots_meter_id_creation_date', table_name='meter_snapshots')
+    op.drop_index('ix_meter_snapshots_meter_id_current_time', table_name='meter_snapshots')
+    _replace_table('meter_snapshots', METER_SNAPSHOTS_COLUMNS, METER_SNAPSHOTS_COLUMN_NAMES, primary_key='id')
+    op.alter_column('meter_snapshots', 'creation_date', existing_type=sa.DateTime(), nullable=True)
+    op.create_index('ix_meter_snapshots_meter_id_creation_date', 'meter_snapshots', ['meter_id', 'creation_date'],
+                    unique=False)
+    op.create_index('ix_meter_snapshots_meter_id_current_time', 'meter_snapshots', ['meter_id', 'current_time'],
+                    unique=False)
+    for detail_table in SNAPSHOT_DETAIL_TABLES:
+        op.execute(f'DELETE FROM {detail_table} WHERE snapshot_id NOT IN (SELECT id FROM meter_snapshots)')
+        op.create_foreign_key(f'{detail_table}_snapshot_id_fkey', detail_table, 'meter_snapshots',
+                              ['snapshot_id'], ['id'], ondelete='CASCADE')
+
+    op.execute('DROP FUNCTION create_monthly_partition(TEXT, DATE)')
@@ -0,0 +1,62 @@
+"""consumption_rollups
+
+Revision ID: 3b8d6f0e2c17
+Revises: 9c4e7b21d0a6
+Create Date: 2021-05-15 11:20:03.402116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8d6f0e2c17'
+down_revision = '9c4e7b21d0a6'
+branch_labels = None
+depends_on = None
+
+GRANULARITIES = {'Hour': 'hour', 'Day': 'day', 'Month': 'month'}
+
+
+def upgrade():
+    op.create_table('meter_consumption_rollups',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('meter_id', sa.Integer(), nullable=False),
+                    sa.Column('granularity', sa.Enum('Hour', 'Day', 'Month', name='rollupgranularity'),
+                              nullable=False),
+                    sa.Column('bucket', sa.DateTime(), nullable=False),
+                    sa.Column('first_time', sa.DateTime(), nullable=False),
+                    sa.Column('first_consumption', sa.Numeric(), nullable=False),
+                    sa.Column('last_time', sa.DateTime(), nullable=False),
+                    sa.Column('last_consumption', sa.Numeric(), nullable=False),
+                    sa.Column('min_consumption', sa.Numeric(), nullable=False),
+                    sa.Column('max_consumption', sa.Numeric(), nullable=False),
+                    sa.Column('delta', sa.Numeric(), nullable=False),
+                    sa.Column('sample_count', sa.Integer(), nullable=False),
+                    sa.ForeignKeyConstraint(['meter_id'], ['meters.id'], ondelete='CASCADE'),
+                    sa.PrimaryKeyConstraint('id'),
+                    sa.UniqueConstraint('meter_id', 'granularity', 'bucket', name='_meter_rollup_bucket_uc')
+                    )
+
+    for granularity, field in GRANULARITIES.items():
+        op.execute(f'''
+            INSERT INTO meter_consumption_rollups (meter_id, granularity, bucket, first_time, first_consumption,
+                                                   last_time, last_consumption, min_consumption, max_consumption,
+                                                   delta, sample_count)
+            SELECT meter_id, '{granularity}', bucket, min(time),
+                   (array_agg(consumption ORDER BY time))[1], max(time),
+                   (array_agg(consumption ORDER BY time DESC))[1], min(consumption), max(consumption),
+                   (array_agg(consumption ORDER BY time DESC))[1] - (array_agg(consumption ORDER BY time))[1],
+                   count(*)
+            FROM (
+                SELECT meter_id, consumption, coalesce("current_time", creation_date) AS time,
+                       date_trunc('{field}', coalesce("current_time", creation_date)) AS bucket
+                FROM meter_snapshots
+            ) AS samples
+            GROUP BY meter_id, bucket
+        ''')
+
+
+def downgrade():
+    op.drop_table('meter_consumption_rollups')
+    op.execute('DROP TYPE rollupgranularity')
@@ -0,0 +1,35 @@
+"""user_replicas
+
+Revision ID: 5e2a9c4d7b31
+Revises: 3b8d6f0e2c17
+Create Date: 2021-05-16 09:45:21.118307
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2a9c4d7b31'
+down_revision = '3b8d6f0e2c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_replicas',
+                    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+                    sa.Column('first_name', sa.String(), nullable=False),
+                    sa.Column('last_name', sa.String(), nullable=False),
+                    sa.Column('email', sa.String(), nullable=False),
+                    sa.Column('contact_infos', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+                    sa.Column('updated', sa.DateTime(timezone=True), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_user_replicas_updated_id', 'user_replicas', ['updated', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_replicas_updated_id', table_name='user_replicas')
+    op.drop_table('user_replicas')
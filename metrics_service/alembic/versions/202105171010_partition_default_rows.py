@@ -0,0 +1,83 @@
+"""partition_default_rows
+
+Revision ID: 8a3f5c1e9b27
+Revises: 5e2a9c4d7b31
+Create Date: 2021-05-17 10:10:38.402115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3f5c1e9b27'
+down_revision = '5e2a9c4d7b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Client timestamps past the created months land in the DEFAULT partition, and Postgres refuses to create a
+    # partition for a range DEFAULT holds rows of. Such rows are moved into the new partition while DEFAULT is detached.
+    # The detached DEFAULT has its triggers disabled during the move, so deleting snapshots from it keeps their details.
+    op.execute('''
+        CREATE OR REPLACE FUNCTION create_monthly_partition(parent_table TEXT, month DATE) RETURNS TEXT AS $$
+        DECLARE
+            partition_start DATE := date_trunc('month', month);
+            partition_end DATE := partition_start + interval '1 month';
+            partition_name TEXT := parent_table || '_p' || to_char(partition_start, 'YYYYMM');
+            default_name TEXT := parent_table || '_default';
+            partition_key TEXT;
+            default_has_rows BOOLEAN := FALSE;
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN partition_name;
+            END IF;
+
+            SELECT attribute.attname INTO partition_key
+            FROM pg_partitioned_table AS partitioned
+            JOIN pg_attribute AS attribute
+                ON attribute.attrelid = partitioned.partrelid AND attribute.attnum = partitioned.partattrs[0]
+            WHERE partitioned.partrelid = parent_table::regclass;
+
+            IF to_regclass(default_name) IS NOT NULL THEN
+                EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                               default_name, partition_key, partition_start, partition_key, partition_end)
+                INTO default_has_rows;
+            END IF;
+
+            IF default_has_rows THEN
+                EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent_table, default_name);
+            END IF;
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, parent_table, partition_start, partition_end);
+            IF default_has_rows THEN
+                EXECUTE format('ALTER TABLE %I DISABLE TRIGGER USER', default_name);
+                EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                               'INSERT INTO %I SELECT * FROM moved',
+                               default_name, partition_key, partition_start, partition_key, partition_end,
+                               partition_name);
+                EXECUTE format('ALTER TABLE %I ENABLE TRIGGER USER', default_name);
+                EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I DEFAULT', parent_table, default_name);
+            END IF;
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+
+def downgrade():
+    op.execute('''
+        CREATE OR REPLACE FUNCTION create_monthly_partition(parent_table TEXT, month DATE) RETURNS TEXT AS $$
+        DECLARE
+            partition_start DATE := date_trunc('month', month);
+            partition_name TEXT := parent_table || '_p' || to_char(partition_start, 'YYYYMM');
+        BEGIN
+            IF to_regclass(partition_name) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                               partition_name, parent_table, partition_start, partition_start + interval '1 month');
+            END IF;
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
@@ -0,0 +1,25 @@
+"""snapshot_time_index
+
+Revision ID: 2d6b9e4f1c58
+Revises: 8a3f5c1e9b27
+Create Date: 2021-05-17 11:30:04.671923
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d6b9e4f1c58'
+down_revision = '8a3f5c1e9b27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_meter_snapshots_meter_id_time', 'meter_snapshots',
+                    ['meter_id', sa.text('coalesce("current_time", creation_date)')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_meter_snapshots_meter_id_time', table_name='meter_snapshots')
@@ -0,0 +1,44 @@
+"""keep_moved_snapshot_details
+
+Revision ID: 6c1f8e3a2d94
+Revises: 2d6b9e4f1c58
+Create Date: 2021-05-18 09:10:27.183540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1f8e3a2d94'
+down_revision = '2d6b9e4f1c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # An update moving a snapshot to another month's partition deletes and inserts the row, the deletion still fires
+    # the trigger. The insertion is done by the time the trigger runs, so a snapshot that still exists keeps its details.
+    op.execute('''
+        CREATE OR REPLACE FUNCTION delete_meter_snapshot_details() RETURNS TRIGGER AS $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM meter_snapshots WHERE id = OLD.id) THEN
+                DELETE FROM heat_meter_snapshots WHERE snapshot_id = OLD.id;
+                DELETE FROM electricity_meter_snapshots WHERE snapshot_id = OLD.id;
+            END IF;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+
+
+def downgrade():
+    op.execute('''
+        CREATE OR REPLACE FUNCTION delete_meter_snapshot_details() RETURNS TRIGGER AS $$
+        BEGIN
+            DELETE FROM heat_meter_snapshots WHERE snapshot_id = OLD.id;
+            DELETE FROM electricity_meter_snapshots WHERE snapshot_id = OLD.id;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
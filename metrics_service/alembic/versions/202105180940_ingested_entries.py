@@ -0,0 +1,27 @@
+"""ingested_entries
+
+Revision ID: 7e4b2d9a1f36
+Revises: 6c1f8e3a2d94
+Create Date: 2021-05-18 09:40:52.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e4b2d9a1f36'
+down_revision = '6c1f8e3a2d94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ingested_entries',
+                    sa.Column('id', sa.String(length=32), nullable=False),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+
+def downgrade():
+    op.drop_table('ingested_entries')
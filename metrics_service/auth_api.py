@@ -1,11 +1,13 @@
+import hashlib
 import os
-from datetime import datetime
+import threading
 from os import environ
-from typing import Dict
+from typing import Dict, Optional, Union, Iterable, List
 
-import requests
-
-from request_models.location_requests import UserModel
+from cache import TTLCache, MISSING
+from common.access_tokens import AccessTokenVerifier
+from common.service_client import ServiceClient
+from request_models.location_requests import UserModel, TokenUserModel
 
 AUTH_API_HOST = environ.get('AUTH_API_HOST', 'localhost')
 AUTH_API_PORT = environ.get('AUTH_API_PORT', '8001')
@@ -13,21 +15,106 @@ AUTH_API_URL = f'http://{AUTH_API_HOST}:{AUTH_API_PORT}'
 
 SERVER_API_KEY = os.environ.get('SERVER_API_KEY', '123')
 
+auth_client = ServiceClient('auth', AUTH_API_URL)
+
+AUTH_CACHE_SIZE = int(environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_TTL = float(environ.get('AUTH_CACHE_TTL', 30))
+AUTH_NEGATIVE_CACHE_TTL = float(environ.get('AUTH_NEGATIVE_CACHE_TTL', 5))
+USER_CACHE_TTL = float(environ.get('USER_CACHE_TTL', 30))
+USER_BATCH_SIZE = 500
+
+auth_cache = TTLCache(max_size=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+user_cache = TTLCache(max_size=AUTH_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_auth_locks: Dict[str, threading.Lock] = {}
+_auth_lock_waiters: Dict[str, int] = {}
+_auth_locks_lock = threading.Lock()
+
+# When set, access tokens are verified locally with the key the auth service signs them with
+JWT_SIGNING_KEY = environ.get('JWT_SIGNING_KEY')
+JWT_ALGORITHM = environ.get('JWT_ALGORITHM', 'HS256')
+REVOCATION_REFRESH_INTERVAL = float(environ.get('REVOCATION_REFRESH_INTERVAL', 30))
+
+
+# Tokens are verified locally only when the key is set, otherwise every token goes through the auth service
+token_verifier = AccessTokenVerifier(auth_client, SERVER_API_KEY, JWT_SIGNING_KEY, JWT_ALGORITHM,
+                                     REVOCATION_REFRESH_INTERVAL) if JWT_SIGNING_KEY else None
+
+
+def _fetch_users(user_ids: List[int]) -> Dict[int, UserModel]:
+    response = auth_client.get('/users/', params={'ids': ','.join(map(str, user_ids))},
+                               headers={'Server-Api-Key': SERVER_API_KEY})
+    response.raise_for_status()
+    return {user['id']: UserModel(**user) for user in response.json()}
+
 
-def get_user(user_id: int) -> UserModel:
-    response = requests.get(url=f'{AUTH_API_URL}/users/{user_id}/', headers={'Server-Api-Key': SERVER_API_KEY})
-    if response.status_code == 404:
+def get_users(user_ids: Iterable[int]) -> Dict[int, UserModel]:
+    users = {}
+    missing_ids = []
+    # ResponsibleUser.user_id is nullable, and one id the auth service can not parse fails the whole batch
+    for user_id in {user_id for user_id in user_ids if isinstance(user_id, int)}:
+        user = user_cache.get(user_id)
+        if user is MISSING:
+            missing_ids.append(user_id)
+        elif user is not None:
+            users[user_id] = user
+
+    for start in range(0, len(missing_ids), USER_BATCH_SIZE):
+        batch = missing_ids[start:start + USER_BATCH_SIZE]
+        found = _fetch_users(batch)
+        for user_id in batch:
+            user = found.get(user_id)
+            user_cache.set(user_id, user, ttl=None if user else AUTH_NEGATIVE_CACHE_TTL)
+            if user:
+                users[user_id] = user
+    return users
+
+
+def get_user(user_id: int) -> Optional[UserModel]:
+    return get_users([user_id]).get(user_id)
+
+
+def _fetch_auth_user(authorization: str) -> Optional[UserModel]:
+    response = auth_client.get('/users/auth-user/', headers={'Authorization': authorization})
+    # Only a rejected token is an answer about the token; errors of the auth service itself are raised and not cached
+    if response.status_code in (401, 403):
         return None
-    user = UserModel(**response.json())
-    return user
+    response.raise_for_status()
+    return UserModel(**response.json())
+
+
+def auth_user(authorization: Optional[str]) -> Optional[Union[UserModel, TokenUserModel]]:
+    if not authorization:
+        return None
+    if token_verifier:
+        claims = token_verifier.decode(authorization)
+        if claims is None:
+            return None
+        # Tokens issued before the permission claims were introduced are still checked by the auth service
+        if 'permissions' in claims:
+            if token_verifier.is_revoked(claims):
+                return None
+            return TokenUserModel(id=claims['user_id'], permissions=claims['permissions'])
 
+    key = hashlib.sha256(authorization.encode()).hexdigest()
+    user = auth_cache.get(key)
+    if user is not MISSING:
+        return user
 
-def auth_user(headers: Dict[str, str]) -> UserModel:
-    if os.environ.get('DEBUG') == 'True':
-        return True
-    response = requests.get(url=f'{AUTH_API_URL}/users/auth-user/',
-                            headers={k.capitalize(): v for k, v in headers.items()})
-    if response.status_code == 404:
-        return False
-    user = UserModel(**response.json())
+    # Concurrent requests with the same token wait for a single round trip to the auth service
+    with _auth_locks_lock:
+        lock = _auth_locks.setdefault(key, threading.Lock())
+        _auth_lock_waiters[key] = _auth_lock_waiters.get(key, 0) + 1
+    try:
+        with lock:
+            user = auth_cache.get(key)
+            if user is MISSING:
+                user = _fetch_auth_user(authorization)
+                auth_cache.set(key, user, ttl=None if user else AUTH_NEGATIVE_CACHE_TTL)
+    finally:
+        # The lock is dropped with its last waiter, so requests arriving meanwhile still share it
+        with _auth_locks_lock:
+            _auth_lock_waiters[key] -= 1
+            if not _auth_lock_waiters[key]:
+                del _auth_lock_waiters[key]
+                del _auth_locks[key]
     return user
@@ -0,0 +1,63 @@
+import argparse
+import statistics
+import threading
+import time
+from typing import List
+
+import requests
+
+
+def percentile(latencies: List[float], percent: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+def hammer(url: str, headers, stop: threading.Event):
+    session = requests.Session()
+    while not stop.is_set():
+        session.get(url, headers=headers)
+
+
+def measure(url: str, headers, duration: float) -> List[float]:
+    session = requests.Session()
+    latencies = []
+    finish = time.monotonic() + duration
+    while time.monotonic() < finish:
+        started = time.monotonic()
+        session.get(url, headers=headers)
+        latencies.append((time.monotonic() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    print(f'{name}: {len(latencies)} requests, p50 {statistics.median(latencies):.1f} ms, '
+          f'p95 {percentile(latencies, 95):.1f} ms, p99 {percentile(latencies, 99):.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of a cheap endpoint while expensive list queries run')
+    parser.add_argument('--base-url', default='http://localhost:8002/metrics')
+    parser.add_argument('--token', default='', help='Authorization header value for the expensive endpoint')
+    parser.add_argument('--cheap', default='/meters/recognize/benchmark/')
+    parser.add_argument('--expensive', default='/meter-snapshots/?page_size=10000&count=exact&order_by=-consumption')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent clients running the expensive query')
+    parser.add_argument('--duration', type=float, default=20)
+    args = parser.parse_args()
+    headers = {'Authorization': args.token} if args.token else {}
+
+    report('idle', measure(args.base_url + args.cheap, headers, args.duration))
+
+    stop = threading.Event()
+    workers = [threading.Thread(target=hammer, args=(args.base_url + args.expensive, headers, stop), daemon=True)
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        report(f'under load ({args.workers} expensive clients)',
+               measure(args.base_url + args.cheap, headers, args.duration))
+    finally:
+        stop.set()
+
+
+if __name__ == '__main__':
+    main()
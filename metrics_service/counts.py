@@ -0,0 +1,61 @@
+import enum
+from os import environ
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from cache import TTLCache, MISSING
+
+COUNT_CACHE_SIZE = int(environ.get('COUNT_CACHE_SIZE', 1000))
+COUNT_CACHE_TTL = float(environ.get('COUNT_CACHE_TTL', 30))
+
+count_cache = TTLCache(max_size=COUNT_CACHE_SIZE, ttl=COUNT_CACHE_TTL)
+
+
+class CountMode(str, enum.Enum):
+    Exact = 'exact'
+    Estimated = 'estimated'
+    Cached = 'cached'
+
+
+class Explain(Executable, ClauseElement):
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return f'EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}'
+
+
+# Partitioned parents carry no statistics of their own, so their partitions are summed as well
+TABLE_ESTIMATE_QUERY = text('''
+    SELECT coalesce(sum(greatest(reltuples, 0)), 0) FROM pg_class
+    WHERE oid = CAST(:table AS regclass)
+       OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))
+''')
+
+
+def estimate_count(db: Session, query: Query, table: str, filtered: bool) -> int:
+    if not filtered:
+        return int(db.execute(TABLE_ESTIMATE_QUERY, {'table': table}).scalar())
+    plan = db.execute(Explain(query.order_by(None).statement)).scalar()
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(db: Session, query: Query, mode: CountMode, table: str,
+               filters: Dict[str, Any]) -> Tuple[int, CountMode]:
+    if mode == CountMode.Estimated:
+        return estimate_count(db, query, table, filtered=bool(filters)), mode
+    if mode == CountMode.Cached:
+        key = (table, tuple(sorted(filters.items())))
+        count = count_cache.get(key)
+        if count is MISSING:
+            count = query.count()
+            count_cache.set(key, count)
+        return count, mode
+    return query.count(), CountMode.Exact
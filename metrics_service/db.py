@@ -1,6 +1,10 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from os import environ
+from typing import Iterator, Optional
 
-from sqlalchemy import create_engine, Column, Integer
+from sqlalchemy import create_engine, Column, Integer, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 
@@ -9,13 +13,50 @@ db_password = environ.get('POSTGRES_PASSWORD', '')
 db_name = environ.get('POSTGRES_DB', '')
 db_host = environ.get('POSTGRES_HOST', '')
 
+DB_POOL_SIZE = int(environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(environ.get('DB_POOL_TIMEOUT', 30))
+# Routes run in this threadpool, so it is sized to match the connections the pool can hand out
+DB_THREADPOOL_SIZE = int(environ.get('DB_THREADPOOL_SIZE', DB_POOL_SIZE + DB_MAX_OVERFLOW))
+
 SQLALCHEMY_DATABASE_URL = f"postgresql://{db_user}:{db_password}@{db_host}/{db_name}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT)
 
 db = sessionmaker(bind=engine)
 
 
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar('query_counter', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.count += 1
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Counts the statements executed in this context, including threadpool calls made from it. query_count_check.py
+    uses it to check that the expanded list pages cost the same number of queries at any page size.
+    """
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+
 class Base:
     id = Column(Integer, primary_key=True)
 
@@ -0,0 +1,71 @@
+import enum
+from typing import Tuple
+
+import numpy as np
+
+
+class DownsampleMethod(str, enum.Enum):
+    Lttb = 'lttb'
+    MinMax = 'minmax'
+
+
+def lttb(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and the last sample and, from every bucket in between, the sample
+    forming the largest triangle with the sample kept from the previous bucket and the average of the next bucket.
+    Returns the indexes of the kept samples.
+    """
+    size = len(times)
+    if points >= size or points < 3:
+        return np.arange(size)
+
+    # Bucket boundaries over the samples between the first and the last one
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+    sizes = np.diff(edges)
+    averages_x = np.add.reduceat(times[1:size - 1], edges[:-1] - 1) / sizes
+    averages_y = np.add.reduceat(values[1:size - 1], edges[:-1] - 1) / sizes
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 1 < points - 2:
+            next_x, next_y = averages_x[bucket + 1], averages_y[bucket + 1]
+        else:
+            next_x, next_y = times[-1], values[-1]
+        previous_x, previous_y = times[selected[bucket]], values[selected[bucket]]
+        areas = np.abs((previous_x - next_x) * (values[start:end] - previous_y)
+                       - (previous_x - times[start:end]) * (next_y - previous_y))
+        selected[bucket + 1] = start + np.argmax(areas)
+    return selected
+
+
+def min_max(times: np.ndarray, values: np.ndarray, points: int) -> np.ndarray:
+    """
+    Splits the time range into points / 2 equal buckets and keeps the lowest and the highest sample of each.
+    Returns the indexes of the kept samples.
+    """
+    size = len(times)
+    buckets = max(points // 2, 1)
+    if points >= size:
+        return np.arange(size)
+
+    bucket_ids = np.minimum(((times - times[0]) / (times[-1] - times[0] or 1) * buckets).astype(np.int64),
+                            buckets - 1)
+    # Times are ordered, so every bucket is a contiguous run of samples
+    starts = np.flatnonzero(np.r_[True, bucket_ids[1:] != bucket_ids[:-1]])
+    counts = np.diff(np.r_[starts, size])
+    indexes = []
+    for reduce in (np.minimum, np.maximum):
+        extremes = np.repeat(reduce.reduceat(values, starts), counts)
+        candidates = np.flatnonzero(values == extremes)
+        _, first = np.unique(bucket_ids[candidates], return_index=True)
+        indexes.append(candidates[first])
+    return np.unique(np.concatenate(indexes))
+
+
+def downsample(times: np.ndarray, values: np.ndarray, points: int,
+               method: DownsampleMethod) -> Tuple[np.ndarray, np.ndarray]:
+    indexes = lttb(times, values, points) if method == DownsampleMethod.Lttb else min_max(times, values, points)
+    return times[indexes], values[indexes]
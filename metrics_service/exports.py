@@ -0,0 +1,220 @@
+import csv
+import enum
+import io
+from datetime import date, datetime
+from os import environ
+from typing import Any, Iterator, List, Type
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import Request
+from sqlalchemy import asc, desc, cast, Boolean, DateTime, Enum, Float, Integer, Numeric, String
+from sqlalchemy.orm import Query
+from starlette.responses import StreamingResponse
+
+from db import Base, db as db_session
+from models.metrics import Meter, MeterSnapshot, HeatMeterSnapshot, ElectricityMeterSnapshot, EnvironmentalReading
+from responses import json_default
+from utils import filter_query, get_ordering_columns
+
+EXPORT_CHUNK_SIZE = int(environ.get('EXPORT_CHUNK_SIZE', 1000))
+# Every batch becomes a Parquet row group, which compresses better the more rows it holds
+COLUMNAR_BATCH_SIZE = int(environ.get('COLUMNAR_BATCH_SIZE', 50000))
+COLUMNAR_COMPRESSION = environ.get('COLUMNAR_COMPRESSION', 'zstd')
+
+
+class ExportFormat(str, enum.Enum):
+    Ndjson = 'ndjson'
+    Csv = 'csv'
+    Parquet = 'parquet'
+    Arrow = 'arrow'
+
+
+COLUMNAR_FORMATS = (ExportFormat.Parquet, ExportFormat.Arrow)
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.Ndjson: 'application/x-ndjson',
+    ExportFormat.Csv: 'text/csv',
+    ExportFormat.Parquet: 'application/vnd.apache.parquet',
+    ExportFormat.Arrow: 'application/vnd.apache.arrow.stream',
+}
+
+
+def table_columns(db_model: Type['Base'], prefix: str = '', exclude: List[str] = ()) -> List[Any]:
+    return [column.label(f'{prefix}{column.name}') for column in db_model.__table__.columns
+            if column.name not in exclude]
+
+
+# Heat and electricity details are flattened into prefixed columns of their snapshot
+SNAPSHOT_EXPORT_COLUMNS = [
+    *table_columns(MeterSnapshot),
+    *table_columns(HeatMeterSnapshot, prefix='heat_', exclude=['id', 'snapshot_id']),
+    *table_columns(ElectricityMeterSnapshot, prefix='electricity_', exclude=['id', 'snapshot_id']),
+]
+# Keys are left out, they authenticate the meter
+METER_EXPORT_COLUMNS = table_columns(Meter, prefix='meter_', exclude=['id', 'secret_key', 'recognition_key'])
+READING_EXPORT_COLUMNS = table_columns(EnvironmentalReading)
+# The meter metadata repeats on every snapshot of the meter, like enum values repeat across rows
+REPEATED_EXPORT_COLUMNS = {column.name for column in METER_EXPORT_COLUMNS}
+
+
+def export_query(query: Query, db_model: Type['Base'], request: Request, default_order_by: str) -> Query:
+    filters = dict(request.query_params)
+    filters.pop('format', None)
+    order_by = filters.pop('order_by', default_order_by)
+    query = filter_query(query, db_model, filters)
+    ordering_columns = get_ordering_columns(db_model, [s.strip() for s in order_by.split(',')])
+    ordering_columns.append((db_model.id, False))
+    return query.order_by(*[desc(column) if descending else asc(column) for column, descending in ordering_columns])
+
+
+def snapshot_export_query(request: Request, with_meter: bool = False) -> Query:
+    columns = SNAPSHOT_EXPORT_COLUMNS + METER_EXPORT_COLUMNS if with_meter else SNAPSHOT_EXPORT_COLUMNS
+    query = Query(columns).select_from(MeterSnapshot) \
+        .outerjoin(HeatMeterSnapshot, HeatMeterSnapshot.snapshot_id == MeterSnapshot.id) \
+        .outerjoin(ElectricityMeterSnapshot, ElectricityMeterSnapshot.snapshot_id == MeterSnapshot.id)
+    if with_meter:
+        query = query.outerjoin(Meter, Meter.id == MeterSnapshot.meter_id)
+    return export_query(query, MeterSnapshot, request, default_order_by='creation_date')
+
+
+def reading_export_query(request: Request) -> Query:
+    query = Query(READING_EXPORT_COLUMNS).select_from(EnvironmentalReading)
+    return export_query(query, EnvironmentalReading, request, default_order_by='current_time')
+
+
+def _row_chunks(query: Query, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[List[Any]]:
+    # The response is streamed after the route returns, so the rows are read with a session of their own
+    session = db_session()
+    try:
+        chunk = []
+        # yield_per reads through a server-side cursor, keeping memory constant however many rows match
+        for row in query.with_session(session).yield_per(chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        session.close()
+
+
+def _ndjson_lines(keys: List[str], chunks: Iterator[List[Any]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield b''.join(orjson.dumps(dict(zip(keys, row)), default=json_default) + b'\n' for row in chunk)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(keys: List[str], chunks: Iterator[List[Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for chunk in chunks:
+        writer.writerows([_csv_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _columnar_column(column: Any) -> Any:
+    # Postgres converts numerics and enums, so the rows arrive as values Arrow takes as they are
+    if isinstance(column.type, Numeric) and not isinstance(column.type, Float):
+        return cast(column.element, Float).label(column.name)
+    if isinstance(column.type, Enum):
+        return cast(column.element, String).label(column.name)
+    return column
+
+
+def _arrow_type(column: Any, repeated: bool) -> pa.DataType:
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us', tz='UTC' if column.type.timezone else None)
+    if repeated:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+class _BufferSink:
+    """Write-only file the Arrow writers write into; its content is taken out after every batch"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _columnar_chunks(query: Query, export_format: ExportFormat) -> Iterator[bytes]:
+    exprs = [column['expr'] for column in query.column_descriptions]
+    columns = [_columnar_column(expr) for expr in exprs]
+    query = query.with_entities(*columns)
+    # Repeated strings are dictionary-encoded, in the Arrow stream as well as in Parquet
+    repeated = [isinstance(expr.type, Enum) or expr.name in REPEATED_EXPORT_COLUMNS for expr in exprs]
+    schema = pa.schema([pa.field(column.name, _arrow_type(column, is_repeated))
+                        for column, is_repeated in zip(columns, repeated)])
+
+    sink = _BufferSink()
+    if export_format == ExportFormat.Parquet:
+        writer = pq.ParquetWriter(sink, schema, compression=COLUMNAR_COMPRESSION)
+    else:
+        writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION))
+    for chunk in _row_chunks(query, COLUMNAR_BATCH_SIZE):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)], schema=schema
+        )
+        if export_format == ExportFormat.Parquet:
+            writer.write_table(pa.Table.from_batches([batch]))
+        else:
+            writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def stream_export(query: Query, export_format: ExportFormat, name: str) -> StreamingResponse:
+    keys = [column['name'] for column in query.column_descriptions]
+    if export_format in COLUMNAR_FORMATS:
+        content = _columnar_chunks(query, export_format)
+    elif export_format == ExportFormat.Csv:
+        content = _csv_lines(keys, _row_chunks(query))
+    else:
+        content = _ndjson_lines(keys, _row_chunks(query))
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{name}.{export_format.value}"'}
+    )
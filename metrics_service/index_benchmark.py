@@ -0,0 +1,174 @@
+import argparse
+import re
+import statistics
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from alembic import command, config
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Connection
+
+# The revision before hot_query_indexes and hot_query_indexes itself
+BEFORE_REVISION = '04f776f46cd2'
+INDEXES_REVISION = '5f1c2a9e7d43'
+
+SERIES_START = datetime(2021, 1, 1)
+SNAPSHOT_INTERVAL = timedelta(minutes=10)
+READING_INTERVAL = timedelta(minutes=15)
+
+# Rows are inserted in time order across meters and rooms, the way devices report them
+SEED_STATEMENTS = [
+    "INSERT INTO building_types (name) VALUES ('benchmark')",
+    "INSERT INTO locations (name, longitude, latitude) VALUES ('benchmark', 0, 0)",
+    '''
+    INSERT INTO buildings (location_id, building_type_id, name, studying_daytime, studying_evening_time,
+                           studying_part_time, working_teachers, working_science, working_help, living_quantity)
+    SELECT 1, 1, 'building ' || n, 0, 0, 0, 0, 0, 0, 0 FROM generate_series(1, :buildings) AS n
+    ''',
+    '''
+    INSERT INTO floors (building_id, index)
+    SELECT building, floor::text FROM generate_series(1, :buildings) AS building,
+                                      generate_series(1, :floors_per_building) AS floor
+    ''',
+    '''
+    INSERT INTO rooms (floor_id, index)
+    SELECT floors.id, room::text FROM floors, generate_series(1, :rooms_per_floor) AS room
+    ''',
+    '''
+    INSERT INTO meters (building_id, type, serial_number, model_number, manufacture_year, secret_key, recognition_key)
+    SELECT n % :buildings + 1, 'Heat', 'serial-' || n, 'benchmark', 2020, 'secret-' || n, 'recognition-' || n
+    FROM generate_series(1, :meters) AS n
+    ''',
+    '''
+    INSERT INTO meter_snapshots (meter_id, type, consumption, automatic, creation_date, "current_time")
+    SELECT meter, 'Heat', sample, true, :series_start + sample * :snapshot_interval,
+           :series_start + sample * :snapshot_interval
+    FROM generate_series(1, :snapshots_per_meter) AS sample, generate_series(1, :meters) AS meter
+    ORDER BY sample, meter
+    ''',
+    '''
+    INSERT INTO environmental_readings (room_id, automatic, "current_time", temperature, humidity)
+    SELECT rooms.id, true, :series_start + sample * :reading_interval, 21.5, 40
+    FROM generate_series(1, :readings_per_room) AS sample, rooms
+    ORDER BY sample, rooms.id
+    ''',
+]
+
+# The filters apply_filtering, the relationship loads and the device endpoints send
+QUERIES = [
+    ('latest snapshots of a meter',
+     'SELECT * FROM meter_snapshots WHERE meter_id = :meter_id ORDER BY creation_date DESC LIMIT 100'),
+    ('snapshots of a meter in a day',
+     'SELECT * FROM meter_snapshots WHERE meter_id = :meter_id '
+     'AND "current_time" >= :snapshots_from AND "current_time" < :snapshots_to ORDER BY "current_time"'),
+    ('readings of a room in a day',
+     'SELECT * FROM environmental_readings WHERE room_id = :room_id '
+     'AND "current_time" >= :readings_from AND "current_time" < :readings_to ORDER BY "current_time"'),
+    ('meter by secret key', 'SELECT id FROM meters WHERE secret_key = :secret_key'),
+    ('meter by recognition key', 'SELECT id FROM meters WHERE recognition_key = :recognition_key'),
+    ('meters of a building', 'SELECT * FROM meters WHERE building_id = :building_id'),
+    ('floors of a building', 'SELECT * FROM floors WHERE building_id = :building_id'),
+    ('rooms of a floor', 'SELECT * FROM rooms WHERE floor_id = :floor_id'),
+]
+
+EXECUTION_TIME = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+def migrate(database_url: str, revision: str):
+    conf = config.Config('alembic.ini')
+    conf.set_section_option('alembic', 'sqlalchemy.url', database_url)
+    command.upgrade(conf, revision)
+
+
+def seed(connection: Connection, args: argparse.Namespace):
+    params = {
+        'buildings': args.buildings,
+        'floors_per_building': args.floors_per_building,
+        'rooms_per_floor': args.rooms_per_floor,
+        'meters': args.meters,
+        'snapshots_per_meter': args.snapshots_per_meter,
+        'readings_per_room': args.readings_per_room,
+        'series_start': SERIES_START,
+        'snapshot_interval': SNAPSHOT_INTERVAL,
+        'reading_interval': READING_INTERVAL,
+    }
+    for statement in SEED_STATEMENTS:
+        connection.execute(text(statement), params)
+
+
+def query_params(args: argparse.Namespace) -> Dict[str, object]:
+    snapshots_from = SERIES_START + args.snapshots_per_meter // 2 * SNAPSHOT_INTERVAL
+    readings_from = SERIES_START + args.readings_per_room // 2 * READING_INTERVAL
+    return {
+        'meter_id': args.meters // 2,
+        'room_id': args.buildings * args.floors_per_building * args.rooms_per_floor // 2,
+        'building_id': args.buildings // 2,
+        'floor_id': args.buildings * args.floors_per_building // 2,
+        'secret_key': f'secret-{args.meters // 2}',
+        'recognition_key': f'recognition-{args.meters // 2}',
+        'snapshots_from': snapshots_from,
+        'snapshots_to': snapshots_from + timedelta(days=1),
+        'readings_from': readings_from,
+        'readings_to': readings_from + timedelta(days=1),
+    }
+
+
+def explain(connection: Connection, query: str, params: Dict[str, object], repeat: int) -> Tuple[List[str], float]:
+    timings = []
+    plan = []
+    for _ in range(repeat):
+        plan = [row[0] for row in connection.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {query}'), params)]
+        timings.append(float(EXECUTION_TIME.search(plan[-1]).group(1)))
+    return plan, statistics.median(timings)
+
+
+def scan_nodes(plan: List[str]) -> List[str]:
+    return [line.strip().lstrip('-> ') for line in plan if 'Scan' in line]
+
+
+def run_queries(connection: Connection, params: Dict[str, object], repeat: int) -> Dict[str, Tuple[List[str], float]]:
+    connection.execute(text('ANALYZE'))
+    return {name: explain(connection, query, params, repeat) for name, query in QUERIES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query plans and latencies of the hot queries before and after '
+                                                 'the hot_query_indexes migration, on a synthetic dataset')
+    parser.add_argument('database_url', help='An empty scratch database, it is migrated and seeded')
+    parser.add_argument('--buildings', type=int, default=50)
+    parser.add_argument('--floors-per-building', type=int, default=5)
+    parser.add_argument('--rooms-per-floor', type=int, default=20)
+    parser.add_argument('--meters', type=int, default=500)
+    parser.add_argument('--snapshots-per-meter', type=int, default=2000)
+    parser.add_argument('--readings-per-room', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query, the median execution time is reported')
+    parser.add_argument('--plans', action='store_true', help='Print the full plans')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if inspect(engine).get_table_names():
+        parser.error('the database is not empty')
+
+    migrate(args.database_url, BEFORE_REVISION)
+    with engine.begin() as connection:
+        seed(connection, args)
+    params = query_params(args)
+    with engine.connect() as connection:
+        before = run_queries(connection, params, args.repeat)
+
+    migrate(args.database_url, INDEXES_REVISION)
+    with engine.connect() as connection:
+        after = run_queries(connection, params, args.repeat)
+
+    for name, _ in QUERIES:
+        (before_plan, before_ms), (after_plan, after_ms) = before[name], after[name]
+        print(f'{name}: {before_ms:.2f} ms -> {after_ms:.2f} ms ({before_ms / max(after_ms, 0.001):.0f}x)')
+        if args.plans:
+            print('  before:\n    ' + '\n    '.join(before_plan))
+            print('  after:\n    ' + '\n    '.join(after_plan))
+        else:
+            print(f'  before: {"; ".join(scan_nodes(before_plan))}\n  after:  {"; ".join(scan_nodes(after_plan))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from os import environ
+from typing import Dict, List, Optional, Any, Set, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.orm import Session
+
+from db import db as db_session
+from models.metrics import MeterSnapshot, HeatMeterSnapshot, ElectricityMeterSnapshot, MeterType, \
+    EnvironmentalReading, IngestedEntry
+from request_models.metrics_requests import AddMeterSnapshotModel, AddEnvironmentalReadingModel
+from rollups import add_to_rollups
+
+INGESTION_MODE = environ.get('INGESTION_MODE', 'sync')
+INGESTION_WAL_PATH = environ.get('INGESTION_WAL_PATH', 'ingestion.wal')
+INGESTION_WAL_FSYNC = environ.get('INGESTION_WAL_FSYNC', 'True') == 'True'
+INGESTION_BATCH_SIZE = int(environ.get('INGESTION_BATCH_SIZE', 500))
+INGESTION_FLUSH_INTERVAL = float(environ.get('INGESTION_FLUSH_INTERVAL', 1.0))
+
+ROW_ERRORS = (IntegrityError, DataError)
+
+logger = logging.getLogger(__name__)
+
+
+def _table_row(db_model, values: Dict[str, Any]) -> Dict[str, Any]:
+    return {column.name: values.get(column.name) for column in db_model.__table__.columns if column.name != 'id'}
+
+
+def _split_snapshot(snapshot_dict: Dict[str, Any]):
+    heat_dict = snapshot_dict.get('heat') or {}
+    electricity_dict = snapshot_dict.get('electricity') or {}
+    snapshot_row = _table_row(MeterSnapshot, snapshot_dict)
+    if snapshot_row['creation_date'] is None:
+        snapshot_row['creation_date'] = datetime.utcnow()
+
+    if snapshot_row['type'] == MeterType.Electricity:
+        return snapshot_row, ElectricityMeterSnapshot, electricity_dict
+    if snapshot_row['type'] == MeterType.Heat:
+        return snapshot_row, HeatMeterSnapshot, heat_dict
+    return snapshot_row, None, None
+
+
+def insert_meter_snapshots(db: Session, snapshot_dicts: List[Dict[str, Any]]) -> List[int]:
+    if not snapshot_dicts:
+        return []
+
+    split = [_split_snapshot(snapshot_dict) for snapshot_dict in snapshot_dicts]
+    result = db.execute(
+        MeterSnapshot.__table__.insert().values([snapshot for snapshot, _, _ in split]).returning(MeterSnapshot.id)
+    )
+    ids = [row[0] for row in result]
+
+    sub_snapshots = {HeatMeterSnapshot: [], ElectricityMeterSnapshot: []}
+    for snapshot_id, (_, sub_model, sub_dict) in zip(ids, split):
+        if sub_model:
+            sub_snapshots[sub_model].append(_table_row(sub_model, {**sub_dict, 'snapshot_id': snapshot_id}))
+    for sub_model, rows in sub_snapshots.items():
+        if rows:
+            db.execute(sub_model.__table__.insert().values(rows))
+    add_to_rollups(db, [snapshot for snapshot, _, _ in split])
+
+    return ids
+
+
+def insert_environmental_readings(db: Session, reading_dicts: List[Dict[str, Any]]) -> List[int]:
+    if not reading_dicts:
+        return []
+
+    rows = [_table_row(EnvironmentalReading, reading_dict) for reading_dict in reading_dicts]
+    for row in rows:
+        if row['automatic'] is None:
+            row['automatic'] = True
+    result = db.execute(
+        EnvironmentalReading.__table__.insert().values(rows).returning(EnvironmentalReading.id)
+    )
+    return [row[0] for row in result]
+
+
+def _save_isolated(db: Session, insert, rows: List[Any]) -> List[Optional[int]]:
+    try:
+        ids = insert(db, rows)
+        db.commit()
+        return ids
+    except ROW_ERRORS:
+        db.rollback()
+
+    ids = []
+    for row in rows:
+        try:
+            with db.begin_nested():
+                ids.extend(insert(db, [row]))
+        except ROW_ERRORS:
+            ids.append(None)
+    db.commit()
+    return ids
+
+
+def save_meter_snapshots(db: Session, snapshot_dicts: List[Dict[str, Any]]) -> List[Optional[int]]:
+    return _save_isolated(db, insert_meter_snapshots, snapshot_dicts)
+
+
+def _claim_entries(db: Session, entry_ids: List[str]) -> Set[str]:
+    """Records the entries as saved within the transaction saving them; returns the ids not recorded before"""
+    if not entry_ids:
+        return set()
+    statement = insert(IngestedEntry.__table__).values([{'id': entry_id} for entry_id in entry_ids])
+    result = db.execute(statement.on_conflict_do_nothing().returning(IngestedEntry.id))
+    return {row[0] for row in result}
+
+
+def _insert_entries(db: Session, entries: List[Tuple[str, str, Dict[str, Any]]]) -> List[int]:
+    # Entries replayed after a crash between saving a batch and marking it in the log are saved already
+    claimed = _claim_entries(db, [entry_id for entry_id, _, _ in entries])
+    ids = []
+    for kind, (_, _, insert_rows) in ENTRY_KINDS.items():
+        ids.extend(insert_rows(db, [data for entry_id, entry_kind, data in entries
+                                    if entry_kind == kind and entry_id in claimed]))
+    return ids
+
+
+def _snapshot_row(model: AddMeterSnapshotModel) -> Dict[str, Any]:
+    snapshot_dict = model.dict()
+    snapshot_dict['automatic'] = True
+    return snapshot_dict
+
+
+def _environmental_reading_row(model: AddEnvironmentalReadingModel) -> Dict[str, Any]:
+    return model.dict()
+
+
+ENTRY_KINDS = {
+    'snapshot': (AddMeterSnapshotModel, _snapshot_row, insert_meter_snapshots),
+    'environmental_reading': (AddEnvironmentalReadingModel, _environmental_reading_row, insert_environmental_readings),
+}
+
+
+# Entries are appended to the write-ahead log and never rewritten. The byte offset up to which the log is saved is kept
+# in a small file next to it, and the log is truncated once the queue is empty. A batch is saved together with the ids
+# of its entries, so entries replayed after a crash between saving a batch and moving the offset are not saved twice.
+class WriteBehindBuffer:
+
+    def __init__(self, wal_path: str, batch_size: int, flush_interval: float, fsync: bool = True):
+        self.wal_path = wal_path
+        self.offset_path = f'{wal_path}.offset'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wal = None
+        self._wal_size = 0
+        self._loop = None
+        self._batch_ready = None
+        self._task = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.batches = 0
+        self.total_batch_size = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    def _open_wal(self):
+        self._wal = open(self.wal_path, 'ab')
+        self._wal_size = os.path.getsize(self.wal_path)
+
+    def _sync(self, file):
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path, encoding='utf-8') as offset_file:
+                return int(offset_file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        temp_path = f'{self.offset_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as offset_file:
+            offset_file.write(str(offset))
+            self._sync(offset_file)
+        os.replace(temp_path, self.offset_path)
+
+    def _recover(self):
+        if not os.path.exists(self.wal_path):
+            return
+        offset = self._read_offset()
+        if offset > os.path.getsize(self.wal_path):
+            # The log was truncated before the offset was reset
+            offset = 0
+        with open(self.wal_path, 'r+b') as wal:
+            wal.seek(offset)
+            for line in wal:
+                if not line.endswith(b'\n'):
+                    # A record cut short by the crash, the next one is appended in its place
+                    logger.warning('Dropping an incomplete write-ahead log record: %r', line)
+                    wal.truncate(offset)
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                    model_class, to_row, _ = ENTRY_KINDS[record['kind']]
+                    entry_id = record.get('id') or uuid.uuid4().hex
+                    data = to_row(model_class(**record['data']))
+                    self._entries.append((time.time(), record['kind'], data, entry_id, offset))
+                except (ValueError, KeyError):
+                    logger.warning('Skipping unreadable write-ahead log record: %r', line)
+        logger.info('Recovered %s entries from %s', len(self._entries), self.wal_path)
+
+    def _commit(self, batch):
+        with self._lock:
+            drained = not self._entries
+            if drained:
+                # Nothing is left to replay; new entries can not be appended before the offset is reset
+                self._wal.truncate(0)
+                self._sync(self._wal)
+                self._wal_size = 0
+                self._write_offset(0)
+        if not drained:
+            self._write_offset(batch[-1][4])
+
+    def _release(self, batch):
+        # The ids are not needed once the offset is past their entries; leftovers only take up space
+        session = db_session()
+        try:
+            session.query(IngestedEntry).filter(IngestedEntry.id.in_([entry_id for _, _, _, entry_id, _ in batch])) \
+                .delete(synchronize_session=False)
+            session.commit()
+        except Exception:
+            logger.warning('Failed to release %s saved entry ids', len(batch), exc_info=True)
+        finally:
+            session.close()
+
+    async def start(self):
+        self._recover()
+        self._open_wal()
+        self._loop = asyncio.get_event_loop()
+        self._batch_ready = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        await self._loop.run_in_executor(None, self.flush)
+        self._wal.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._loop.run_in_executor(None, self.flush)
+
+    def put(self, kind: str, model: BaseModel):
+        _, to_row, _ = ENTRY_KINDS[kind]
+        data = to_row(model)
+        entry_id = uuid.uuid4().hex
+        line = (json.dumps({'id': entry_id, 'kind': kind, 'data': json.loads(model.json())}) + '\n').encode('utf-8')
+        with self._lock:
+            self._wal.write(line)
+            self._sync(self._wal)
+            self._wal_size += len(line)
+            self._entries.append((time.time(), kind, data, entry_id, self._wal_size))
+            self.enqueued += 1
+            queue_depth = len(self._entries)
+        if queue_depth >= self.batch_size:
+            self._loop.call_soon_threadsafe(self._batch_ready.set)
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._entries.popleft() for _ in range(min(self.batch_size, len(self._entries)))]
+                if not batch:
+                    return
+
+                started = time.monotonic()
+                session = db_session()
+                try:
+                    ids = _save_isolated(session, _insert_entries,
+                                         [(entry_id, kind, data) for _, kind, data, entry_id, _ in batch])
+                except Exception:
+                    with self._lock:
+                        self._entries.extendleft(reversed(batch))
+                    self.failed_flushes += 1
+                    logger.exception('Failed to flush %s buffered entries', len(batch))
+                    return
+                finally:
+                    session.close()
+
+                self._record_flush(batch, ids, time.monotonic() - started)
+                self._commit(batch)
+                self._release(batch)
+
+    def _record_flush(self, batch, ids, latency: float):
+        dropped = ids.count(None)
+        if dropped:
+            logger.error('Dropped %s buffered entries rejected by the database', dropped)
+        self.dropped += dropped
+        self.flushed += len(batch) - dropped
+        self.batches += 1
+        self.total_batch_size += len(batch)
+        self.last_batch_size = len(batch)
+        self.max_batch_size = max(self.max_batch_size, len(batch))
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queue_depth = len(self._entries)
+            oldest_entry_age = time.time() - self._entries[0][0] if self._entries else 0.0
+        return {
+            'mode': INGESTION_MODE,
+            'queue_depth': queue_depth,
+            'oldest_entry_age_sec': oldest_entry_age,
+            'enqueued': self.enqueued,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'failed_flushes': self.failed_flushes,
+            'batches': self.batches,
+            'last_batch_size': self.last_batch_size,
+            'max_batch_size': self.max_batch_size,
+            'avg_batch_size': self.total_batch_size / self.batches if self.batches else 0.0,
+            'last_flush_latency_ms': self.last_flush_latency * 1000,
+            'max_flush_latency_ms': self.max_flush_latency * 1000,
+            'avg_flush_latency_ms': self.total_flush_latency * 1000 / self.batches if self.batches else 0.0,
+        }
+
+
+ingestion_buffer = WriteBehindBuffer(
+    wal_path=INGESTION_WAL_PATH,
+    batch_size=INGESTION_BATCH_SIZE,
+    flush_interval=INGESTION_FLUSH_INTERVAL,
+    fsync=INGESTION_WAL_FSYNC,
+) if INGESTION_MODE == 'buffered' else None
@@ -1,15 +1,26 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import uvicorn
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from db import DB_THREADPOOL_SIZE
+from ingestion import ingestion_buffer
 from middlewares.auth_middleware import AuthMiddleware
+from middlewares.query_count_middleware import QueryCountMiddleware
+from partitions import maintain_partitions
 from routes import metrics_router
 from routes.metrics import *
 from routes.locations import *
+from user_directory import maintain_user_directory
 
 app = FastAPI()
 app.include_router(metrics_router)
 app.add_middleware(AuthMiddleware)
+if os.environ.get('DEBUG') == 'True':
+    app.add_middleware(QueryCountMiddleware)
 
 origins = ["*"]
 
@@ -22,5 +33,32 @@ app.add_middleware(
 )
 
 
+@app.on_event('startup')
+async def configure_threadpool():
+    asyncio.get_event_loop().set_default_executor(ThreadPoolExecutor(max_workers=DB_THREADPOOL_SIZE))
+
+
+@app.on_event('startup')
+async def start_partition_maintenance():
+    asyncio.ensure_future(maintain_partitions())
+
+
+@app.on_event('startup')
+async def start_user_directory_sync():
+    asyncio.ensure_future(maintain_user_directory())
+
+
+@app.on_event('startup')
+async def start_ingestion_buffer():
+    if ingestion_buffer:
+        await ingestion_buffer.start()
+
+
+@app.on_event('shutdown')
+async def stop_ingestion_buffer():
+    if ingestion_buffer:
+        await ingestion_buffer.stop()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="localhost", port=8002, log_level="info")
@@ -0,0 +1,63 @@
+from os import environ
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from cache import TTLCache, MISSING
+from models.metrics import Meter
+
+METER_KEY_CACHE_SIZE = int(environ.get('METER_KEY_CACHE_SIZE', 10000))
+METER_KEY_CACHE_TTL = float(environ.get('METER_KEY_CACHE_TTL', 300))
+METER_KEY_NEGATIVE_CACHE_SIZE = int(environ.get('METER_KEY_NEGATIVE_CACHE_SIZE', 1000))
+METER_KEY_NEGATIVE_CACHE_TTL = float(environ.get('METER_KEY_NEGATIVE_CACHE_TTL', 30))
+
+secret_key_cache = TTLCache(max_size=METER_KEY_CACHE_SIZE, ttl=METER_KEY_CACHE_TTL)
+recognition_key_cache = TTLCache(max_size=METER_KEY_CACHE_SIZE, ttl=METER_KEY_CACHE_TTL)
+# Unknown keys are kept apart, so a stream of random keys can not evict the keys of real meters
+unknown_secret_key_cache = TTLCache(max_size=METER_KEY_NEGATIVE_CACHE_SIZE, ttl=METER_KEY_NEGATIVE_CACHE_TTL)
+unknown_recognition_key_cache = TTLCache(max_size=METER_KEY_NEGATIVE_CACHE_SIZE, ttl=METER_KEY_NEGATIVE_CACHE_TTL)
+
+
+def _resolve_keys(db: Session, column, cache: TTLCache, unknown_cache: TTLCache,
+                  keys: Iterable[str]) -> Dict[str, int]:
+    meter_ids = {}
+    missing_keys = set()
+    for key in set(keys) - {None}:
+        meter_id = cache.get(key)
+        if meter_id is not MISSING:
+            meter_ids[key] = meter_id
+        elif unknown_cache.get(key) is MISSING:
+            missing_keys.add(key)
+
+    if missing_keys:
+        found = dict(db.query(column, Meter.id).filter(column.in_(missing_keys)).all())
+        for key in missing_keys:
+            if key in found:
+                cache.set(key, found[key])
+                meter_ids[key] = found[key]
+            else:
+                unknown_cache.set(key, True)
+
+    return meter_ids
+
+
+def resolve_secret_keys(db: Session, secret_keys: Iterable[str]) -> Dict[str, int]:
+    return _resolve_keys(db, Meter.secret_key, secret_key_cache, unknown_secret_key_cache, secret_keys)
+
+
+def get_meter_id_by_secret_key(db: Session, secret_key: str) -> Optional[int]:
+    return resolve_secret_keys(db, [secret_key]).get(secret_key)
+
+
+def get_meter_id_by_recognition_key(db: Session, recognition_key: str) -> Optional[int]:
+    return _resolve_keys(db, Meter.recognition_key, recognition_key_cache, unknown_recognition_key_cache,
+                         [recognition_key]).get(recognition_key)
+
+
+def invalidate_meter_keys(meter_id: int = None, keys: Iterable[str] = ()):
+    for cache in (secret_key_cache, recognition_key_cache):
+        if meter_id is not None:
+            cache.pop_where(lambda key, value: value == meter_id)
+    for cache in (secret_key_cache, recognition_key_cache, unknown_secret_key_cache, unknown_recognition_key_cache):
+        for key in keys:
+            cache.pop(key)
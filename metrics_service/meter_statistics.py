@@ -0,0 +1,72 @@
+import enum
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from series import SNAPSHOT_TIME, SeriesField, series_source
+
+
+class Statistic(str, enum.Enum):
+    Count = 'count'
+    Min = 'min'
+    Max = 'max'
+    Avg = 'avg'
+    Median = 'median'
+    Mode = 'mode'
+    First = 'first'
+    Last = 'last'
+
+
+STATISTIC_EXPRESSIONS = {
+    Statistic.Count: 'count(*)',
+    Statistic.Min: 'min(value)',
+    Statistic.Max: 'max(value)',
+    Statistic.Avg: 'avg(value)',
+    Statistic.Median: 'percentile_cont(0.5) WITHIN GROUP (ORDER BY value)',
+    Statistic.Mode: 'mode() WITHIN GROUP (ORDER BY value)',
+    Statistic.First: '(array_agg(value ORDER BY time, id))[1]',
+    Statistic.Last: '(array_agg(value ORDER BY time DESC, id DESC))[1]',
+}
+
+# Snapshots without a value for the field are skipped, so first and last are the first and last actual readings.
+# Snapshots are placed at the same time as in the consumption series, so manual ones are counted as well.
+STATISTICS_QUERY = '''
+    SELECT meter_id, {aggregates}
+    FROM (
+        SELECT snapshots.meter_id, {time} AS time, snapshots.id, {value} AS value
+        FROM {source}
+        WHERE snapshots.meter_id = ANY(:meter_ids)
+          AND {time} >= :start
+          AND {time} < :end
+          AND {value} IS NOT NULL
+    ) AS samples
+    GROUP BY meter_id
+'''
+
+
+def parse_statistics(value: str) -> List[Statistic]:
+    """Parses a comma separated list of statistics, raising ValueError for unknown ones"""
+    return list(dict.fromkeys(Statistic(name.strip()) for name in value.split(',') if name.strip()))
+
+
+def meter_statistics(db: Session, meter_ids: List[int], start: datetime, end: datetime, field: SeriesField,
+                     statistics: List[Statistic]) -> Dict[int, Dict[str, Any]]:
+    source, value = series_source(field)
+    query = STATISTICS_QUERY.format(
+        aggregates=', '.join(f'{STATISTIC_EXPRESSIONS[statistic]} AS {statistic.value}' for statistic in statistics),
+        time=SNAPSHOT_TIME,
+        value=value,
+        source=source,
+    )
+    result = db.execute(text(query), {'meter_ids': meter_ids, 'start': start, 'end': end})
+    rows = {row.meter_id: row for row in result}
+
+    # Meters without readings in the range still get an entry
+    empty = {statistic.value: 0 if statistic == Statistic.Count else None for statistic in statistics}
+    return {
+        meter_id: {statistic.value: getattr(rows[meter_id], statistic.value) for statistic in statistics}
+        if meter_id in rows else dict(empty)
+        for meter_id in meter_ids
+    }
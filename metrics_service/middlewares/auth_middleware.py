@@ -1,5 +1,6 @@
 import os
 
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
@@ -11,12 +12,14 @@ SERVER_API_KEY = os.environ.get('SERVER_API_KEY', '123')
 
 class AuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        headers = dict(request.headers)
+        request.state.user = None
+        request.state.is_server = request.headers.get('Server-Api-Key') == SERVER_API_KEY
 
-        if headers.get('Server-Api-Key') == SERVER_API_KEY:
+        if request.state.is_server or os.environ.get('DEBUG') == 'True':
             return await call_next(request)
 
-        if auth_user(headers):
+        request.state.user = await run_in_threadpool(auth_user, request.headers.get('Authorization'))
+        if request.state.user:
             return await call_next(request)
 
         return JSONResponse(content={'detail': 'Authorization Error'}, status_code=401)
@@ -0,0 +1,15 @@
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from db import count_queries
+
+
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    """Reports the number of database queries a request cost in the X-Query-Count header"""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        with count_queries() as counter:
+            response = await call_next(request)
+        response.headers['X-Query-Count'] = str(counter.count)
+        return response
@@ -1,6 +1,7 @@
 import enum
 
-from sqlalchemy import Column, String, Integer, UniqueConstraint, ForeignKey, Numeric, Enum
+from sqlalchemy import Column, String, Integer, UniqueConstraint, ForeignKey, Numeric, Enum, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from db import Base
@@ -84,17 +85,31 @@ class Location(Base):
 class ResponsibleUser(Base):
     __tablename__ = 'responsible_users'
 
-    user_id = Column(Integer)
+    user_id = Column(Integer, index=True)
     rank = Column(String(255), nullable=False)
-    building_id = Column(Integer, ForeignKey('buildings.id'))
+    building_id = Column(Integer, ForeignKey('buildings.id'), index=True)
     responsibility = Column(String(255), nullable=True)
 
 
+class UserReplica(Base):
+    """Read-only copy of the auth service users, kept up to date by user_directory.sync_users"""
+    __tablename__ = 'user_replicas'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    first_name = Column(String, nullable=False)
+    last_name = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+    contact_infos = Column(JSONB, nullable=False, default=list)
+    updated = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (Index('ix_user_replicas_updated_id', 'updated', 'id'),)
+
+
 class Building(Base):
     __tablename__ = 'buildings'
 
-    location_id = Column(Integer, ForeignKey('locations.id', ondelete='CASCADE'), nullable=False)
-    building_type_id = Column(Integer, ForeignKey('building_types.id', ondelete='CASCADE'), nullable=False)
+    location_id = Column(Integer, ForeignKey('locations.id', ondelete='CASCADE'), nullable=False, index=True)
+    building_type_id = Column(Integer, ForeignKey('building_types.id', ondelete='CASCADE'), nullable=False, index=True)
     meters = relationship(Meter, backref="building")
     floors = relationship("Floor", backref="building")
     responsible_people = relationship("ResponsibleUser", backref="building")
@@ -128,7 +143,7 @@ class Building(Base):
 class Floor(Base):
     __tablename__ = 'floors'
 
-    building_id = Column(Integer, ForeignKey('buildings.id', ondelete='CASCADE'), nullable=False)
+    building_id = Column(Integer, ForeignKey('buildings.id', ondelete='CASCADE'), nullable=False, index=True)
     index = Column(String(255), nullable=False)
     height = Column(Numeric, nullable=True, default=None)
     floor_plan_document_id = Column(Integer, nullable=True)
@@ -141,7 +156,7 @@ class Floor(Base):
 class FloorPlanItem(Base):
     __tablename__ = 'floor_items'
 
-    floor_id = Column(Integer, ForeignKey('floors.id', ondelete='CASCADE'), nullable=False)
+    floor_id = Column(Integer, ForeignKey('floors.id', ondelete='CASCADE'), nullable=False, index=True)
     type = Column(Enum(FloorItemType), nullable=False)
     item_id = Column(Integer, nullable=False)
     position_x = Column(Numeric, nullable=False)
@@ -152,7 +167,7 @@ class Room(Base):
     __tablename__ = 'rooms'
 
     index = Column(String(255), nullable=False)
-    floor_id = Column(Integer, ForeignKey('floors.id', ondelete='CASCADE'), nullable=False)
+    floor_id = Column(Integer, ForeignKey('floors.id', ondelete='CASCADE'), nullable=False, index=True)
     designation = Column(String(255), nullable=True)
     size = Column(Numeric, nullable=True, default=None)
     responsible_department = Column(String(255), nullable=True)
@@ -166,7 +181,7 @@ class Room(Base):
 class Window(Base):
     __tablename__ = 'windows'
 
-    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
+    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     type = Column(Enum(WindowType), nullable=False)
     thickness = Column(Numeric, nullable=True)
@@ -176,7 +191,7 @@ class Window(Base):
 class HeatingBattery(Base):
     __tablename__ = 'heating_batteries'
 
-    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
+    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     type = Column(Enum(HeatingBatteryType), nullable=False)
     sections = Column(Integer, nullable=True)
@@ -185,7 +200,7 @@ class HeatingBattery(Base):
 class WaterEquipment(Base):
     __tablename__ = 'water_equipment'
 
-    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
+    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     type = Column(Enum(WaterEquipmentType), nullable=False)
 
@@ -193,7 +208,7 @@ class WaterEquipment(Base):
 class ElectricEquipment(Base):
     __tablename__ = 'electric_equipment'
 
-    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False)
+    room_id = Column(Integer, ForeignKey('rooms.id', ondelete='CASCADE'), nullable=False, index=True)
     amount = Column(Integer, nullable=False)
     group = Column(Enum(ElectricEquipmentGroup), nullable=False)
     type = Column(Enum(ElectricEquipmentType), nullable=False)
@@ -2,7 +2,8 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Numeric, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum, Numeric, Boolean, Index, \
+    UniqueConstraint, func
 from sqlalchemy.orm import relationship
 
 from db import Base
@@ -15,11 +16,18 @@ class MeterType(enum.Enum):
     Electricity = 'Electricity'
 
 
+class RollupGranularity(enum.Enum):
+    Hour = 'Hour'
+    Day = 'Day'
+    Month = 'Month'
+
+
 class ElectricityMeterSnapshot(Base):
     __tablename__ = 'electricity_meter_snapshots'
 
-    snapshot_id = Column(Integer, ForeignKey('meter_snapshots.id', ondelete='CASCADE'), unique=True, nullable=False)
-    snapshot = relationship('MeterSnapshot', back_populates='electricity_meter_snapshot')
+    snapshot_id = Column(Integer, unique=True, nullable=False)
+    snapshot = relationship('MeterSnapshot', back_populates='electricity_meter_snapshot',
+                            primaryjoin='MeterSnapshot.id == foreign(ElectricityMeterSnapshot.snapshot_id)')
     voltage = Column(Numeric, nullable=False)
     current = Column(Numeric, nullable=True)
 
@@ -27,8 +35,9 @@ class ElectricityMeterSnapshot(Base):
 class HeatMeterSnapshot(Base):
     __tablename__ = 'heat_meter_snapshots'
 
-    snapshot_id = Column(Integer, ForeignKey('meter_snapshots.id', ondelete='CASCADE'), unique=True, nullable=False)
-    snapshot = relationship('MeterSnapshot', back_populates='heat_meter_snapshot')
+    snapshot_id = Column(Integer, unique=True, nullable=False)
+    snapshot = relationship('MeterSnapshot', back_populates='heat_meter_snapshot',
+                            primaryjoin='MeterSnapshot.id == foreign(HeatMeterSnapshot.snapshot_id)')
     incoming_temperature = Column(Numeric, nullable=True)
     outgoing_temperature = Column(Numeric, nullable=True)
     incoming_pump_usage = Column(Numeric, nullable=True)
@@ -47,18 +56,34 @@ class MeterSnapshot(Base):
     type = Column(Enum(MeterType), nullable=False)
     consumption = Column(Numeric, nullable=False)
     automatic = Column(Boolean, nullable=False)
-    creation_date = Column(DateTime, default=datetime.utcnow)
+    creation_date = Column(DateTime, default=datetime.utcnow, nullable=False)
     current_time = Column(DateTime, nullable=True)
     uptime = Column(Numeric, nullable=True, default=None)
 
-    heat_meter_snapshot = relationship(HeatMeterSnapshot, back_populates='snapshot', uselist=False)
-    electricity_meter_snapshot = relationship(ElectricityMeterSnapshot, back_populates='snapshot', uselist=False)
+    # Detail rows are deleted by the meter_snapshots_delete_details trigger, see the time_partitioning migration
+    heat_meter_snapshot = relationship(
+        HeatMeterSnapshot, back_populates='snapshot', uselist=False, passive_deletes='all',
+        primaryjoin='MeterSnapshot.id == foreign(HeatMeterSnapshot.snapshot_id)')
+    electricity_meter_snapshot = relationship(
+        ElectricityMeterSnapshot, back_populates='snapshot', uselist=False, passive_deletes='all',
+        primaryjoin='MeterSnapshot.id == foreign(ElectricityMeterSnapshot.snapshot_id)')
+
+    __table_args__ = (
+        Index('ix_meter_snapshots_meter_id_creation_date', 'meter_id', 'creation_date'),
+        Index('ix_meter_snapshots_meter_id_current_time', 'meter_id', 'current_time'),
+        {'postgresql_partition_by': 'RANGE (creation_date)'},
+    )
+
+
+# Consumption series place snapshots at this time, see series.CONSUMPTION_QUERY
+Index('ix_meter_snapshots_meter_id_time', MeterSnapshot.meter_id,
+      func.coalesce(MeterSnapshot.current_time, MeterSnapshot.creation_date))
 
 
 class Meter(Base):
     __tablename__ = 'meters'
 
-    building_id = Column(Integer, ForeignKey('buildings.id', ondelete='SET NULL'), nullable=True)
+    building_id = Column(Integer, ForeignKey('buildings.id', ondelete='SET NULL'), nullable=True, index=True)
     type = Column(Enum(MeterType), nullable=False)
     serial_number = Column(String(255), unique=True, nullable=False)
     model_number = Column(String(255), nullable=False)
@@ -76,14 +101,39 @@ class Meter(Base):
     snapshots = relationship(MeterSnapshot, backref='meter')
     electricity = relationship('ElectricityMeter', back_populates='meter', uselist=False)
 
-    secret_key = Column(String(255), default=uuid.uuid4, nullable=True)
-    recognition_key = Column(String(255), default=uuid.uuid4, nullable=True)
+    secret_key = Column(String(255), default=uuid.uuid4, nullable=True, unique=True, index=True)
+    recognition_key = Column(String(255), default=uuid.uuid4, nullable=True, unique=True, index=True)
 
     is_working = Column(Boolean, default=True)
     average_hours_per_day_usage = Column(Integer, nullable=True)
     average_days_per_week_usage = Column(Integer, nullable=True)
 
 
+class MeterConsumptionRollup(Base):
+    __tablename__ = 'meter_consumption_rollups'
+
+    meter_id = Column(Integer, ForeignKey('meters.id', ondelete='CASCADE'), nullable=False)
+    granularity = Column(Enum(RollupGranularity), nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    first_time = Column(DateTime, nullable=False)
+    first_consumption = Column(Numeric, nullable=False)
+    last_time = Column(DateTime, nullable=False)
+    last_consumption = Column(Numeric, nullable=False)
+    min_consumption = Column(Numeric, nullable=False)
+    max_consumption = Column(Numeric, nullable=False)
+    delta = Column(Numeric, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+
+    __table_args__ = (UniqueConstraint('meter_id', 'granularity', 'bucket', name='_meter_rollup_bucket_uc'),)
+
+
+class IngestedEntry(Base):
+    """Ids of the buffered entries saved while the write-ahead log may still replay them, see ingestion.py"""
+    __tablename__ = 'ingested_entries'
+
+    id = Column(String(32), primary_key=True)
+
+
 class ElectricityMeter(Base):
     __tablename__ = 'electricity_meters'
 
@@ -102,3 +152,8 @@ class EnvironmentalReading(Base):
     temperature = Column(Numeric, nullable=True)
     humidity = Column(Numeric, nullable=True)
     notes = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        Index('ix_environmental_readings_room_id_current_time', 'room_id', 'current_time'),
+        {'postgresql_partition_by': 'RANGE ("current_time")'},
+    )
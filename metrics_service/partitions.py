@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import sys
+from datetime import date
+from os import environ
+
+from sqlalchemy import text
+
+from db import engine
+
+PARTITIONED_TABLES = ('meter_snapshots', 'environmental_readings')
+# Tables referencing rows of a partitioned table by id, cleaned up by a trigger that detaching does not fire
+DETAIL_TABLES = {
+    'meter_snapshots': ('heat_meter_snapshots', 'electricity_meter_snapshots'),
+}
+PARTITION_MONTHS_AHEAD = int(environ.get('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_MAINTENANCE_INTERVAL = float(environ.get('PARTITION_MAINTENANCE_INTERVAL', 24 * 60 * 60))
+
+logger = logging.getLogger(__name__)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def create_future_partitions(months_ahead: int = PARTITION_MONTHS_AHEAD):
+    # Every partition gets its own transaction, so one that can not be created does not hold back the others
+    for table in PARTITIONED_TABLES:
+        for months in range(months_ahead + 1):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(
+                        text("SELECT create_monthly_partition(:table, (date_trunc('month', now()) "
+                             "+ :months * interval '1 month')::date)"),
+                        table=table, months=months
+                    )
+            except Exception:
+                logger.exception('Failed to create the partition of %s %s months ahead', table, months)
+
+
+def detach_partition(table: str, month: date):
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f'{table} is not partitioned')
+    partition = partition_name(table, month)
+    with engine.begin() as connection:
+        # The detail rows of the detached month would be left behind without a snapshot
+        for detail_table in DETAIL_TABLES.get(table, ()):
+            connection.execute(text(f'DELETE FROM {detail_table} WHERE snapshot_id IN (SELECT id FROM {partition})'))
+        connection.execute(text(f'ALTER TABLE {table} DETACH PARTITION {partition}'))
+
+
+async def maintain_partitions():
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, create_future_partitions)
+        except Exception:
+            logger.exception('Failed to create future partitions')
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL)
+
+
+if __name__ == '__main__':
+    # python partitions.py detach meter_snapshots 2021-01
+    if len(sys.argv) == 4 and sys.argv[1] == 'detach':
+        year, month = sys.argv[3].split('-')
+        detach_partition(sys.argv[2], date(int(year), int(month), 1))
+    else:
+        create_future_partitions()
@@ -0,0 +1,94 @@
+import argparse
+import sys
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Tuple, Type
+from urllib.parse import urlencode
+
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from db import Base, count_queries, db as db_session
+from models.location import Building, BuildingType, Floor, Location, Room
+from models.metrics import HeatMeterSnapshot, Meter, MeterSnapshot, MeterType
+from request_models.location_requests import BuildingModel
+from request_models.metrics_requests import MeterModel, MeterSnapshotModel
+from utils import get_page
+
+# The pages the loader plans in serialization.py build, filtered down to the rows seeded for the check
+PAGES = [
+    ('buildings with floors and rooms', Building, BuildingModel,
+     {'location_id': '{location_id}', 'expand': 'floors.rooms'}),
+    ('buildings with meters and snapshots', Building, BuildingModel,
+     {'location_id': '{location_id}', 'expand': 'meters.snapshots.heat_meter_snapshot'}),
+    ('meters with snapshots', Meter, MeterModel,
+     {'model_number': '{tag}', 'expand': 'electricity,snapshots.heat_meter_snapshot'}),
+    ('meter snapshots', MeterSnapshot, MeterSnapshotModel,
+     {'meter_id': '{meter_id}', 'expand': 'heat_meter_snapshot,electricity_meter_snapshot'}),
+]
+
+
+def seed(db: Session, rows: int) -> Dict[str, str]:
+    tag = f'query-count-{uuid.uuid4().hex[:8]}'
+    location = Location(name=tag, longitude=0, latitude=0)
+    building_type = BuildingType(name=tag)
+    started = datetime.utcnow() - timedelta(minutes=rows)
+    meters = []
+    for building_index in range(rows):
+        building = Building(name=f'{tag} {building_index}', location=location, building_type=building_type)
+        for floor_index in range(2):
+            floor = Floor(building=building, index=str(floor_index))
+            floor.rooms = [Room(index=str(room_index)) for room_index in range(2)]
+        meter = Meter(building=building, type=MeterType.Heat, serial_number=f'{tag}-{building_index}',
+                      model_number=tag, manufacture_year=2021)
+        # The first meter gets a full page of snapshots, the others a few each
+        for minute in range(rows if building_index == 0 else 2):
+            snapshot = MeterSnapshot(meter=meter, type=MeterType.Heat, consumption=Decimal(minute), automatic=True,
+                                     creation_date=started + timedelta(minutes=minute))
+            snapshot.heat_meter_snapshot = HeatMeterSnapshot(heat_consumption=Decimal(minute))
+        meters.append(meter)
+    db.add(location)
+    db.flush()
+    return {'tag': tag, 'location_id': str(location.id), 'meter_id': str(meters[0].id)}
+
+
+def page_request(params: Dict[str, str]) -> Request:
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': [],
+                    'query_string': urlencode(params).encode()})
+
+
+def count_page(db: Session, db_model: Type['Base'], serializer, params: Dict[str, str]) -> Tuple[int, int]:
+    with count_queries() as counter:
+        page = get_page(db, db_model, serializer, page_request(params))
+    return counter.count, page['page_size']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checks that the expanded list pages cost the same number of '
+                                                 'queries at a small and a large page size')
+    parser.add_argument('--small', type=int, default=2)
+    parser.add_argument('--large', type=int, default=20)
+    args = parser.parse_args()
+
+    # The rows are seeded into the configured database and rolled back afterwards
+    db = db_session()
+    failed = False
+    try:
+        seeded = seed(db, args.large)
+        for name, db_model, serializer, params in PAGES:
+            params = {key: value.format(**seeded) for key, value in params.items()}
+            small_queries, small_items = count_page(db, db_model, serializer, {**params, 'page_size': args.small})
+            large_queries, large_items = count_page(db, db_model, serializer, {**params, 'page_size': args.large})
+            ok = small_queries == large_queries and small_items < large_items
+            failed = failed or not ok
+            print(f'{"ok" if ok else "FAILED"} {name}: {small_items} items {small_queries} queries, '
+                  f'{large_items} items {large_queries} queries')
+    finally:
+        db.rollback()
+        db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
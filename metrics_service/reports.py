@@ -0,0 +1,60 @@
+from os import environ
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from cache import TTLCache, MISSING
+from models.location import Building, BuildingType, Location
+from response_cache import table_versions
+
+REPORT_CACHE_SIZE = int(environ.get('REPORT_CACHE_SIZE', 100))
+# Keys include the versions of the tables a report reads, the TTL bounds how stale other workers can get
+REPORT_CACHE_TTL = float(environ.get('REPORT_CACHE_TTL', 300))
+
+report_cache = TTLCache(max_size=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+
+PERSONNEL = Building.working_teachers + Building.working_science + Building.working_help
+STUDYING = Building.studying_daytime + Building.studying_evening_time + Building.studying_part_time
+HEADCOUNT_COLUMNS = [
+    func.coalesce(func.sum(PERSONNEL), 0).label('personnel'),
+    func.coalesce(func.sum(Building.living_quantity), 0).label('living'),
+    func.coalesce(func.sum(STUDYING), 0).label('studying'),
+]
+
+
+def _cached(name: str, tables: Set[str], compute):
+    key = (name, table_versions.get(tables))
+    value = report_cache.get(key)
+    if value is MISSING:
+        value = compute()
+        report_cache.set(key, value)
+    return value
+
+
+def headcount(db: Session) -> Dict[str, int]:
+    return _cached('headcount', {'buildings'}, lambda: db.query(*HEADCOUNT_COLUMNS).one()._asdict())
+
+
+def headcount_by_location(db: Session) -> List[Dict[str, Any]]:
+    return _cached('headcount_by_location', {'buildings', 'locations'}, lambda: [row._asdict() for row in (
+        db.query(Location.id.label('location_id'), Location.name, *HEADCOUNT_COLUMNS)
+        .outerjoin(Building, Building.location_id == Location.id)
+        .group_by(Location.id)
+        .order_by(Location.id)
+    )])
+
+
+def headcount_by_building_type(db: Session) -> List[Dict[str, Any]]:
+    return _cached('headcount_by_building_type', {'buildings', 'building_types'}, lambda: [row._asdict() for row in (
+        db.query(BuildingType.id.label('building_type_id'), BuildingType.name, *HEADCOUNT_COLUMNS)
+        .outerjoin(Building, Building.building_type_id == BuildingType.id)
+        .group_by(BuildingType.id)
+        .order_by(BuildingType.id)
+    )])
+
+
+def building_type_counts(db: Session) -> Dict[int, int]:
+    return _cached('building_type_counts', {'buildings'}, lambda: dict(
+        db.query(Building.building_type_id, func.count(Building.id)).group_by(Building.building_type_id).all()
+    ))
@@ -1,7 +1,11 @@
-from typing import List, Type
+from typing import Dict, List, Optional, Type
 
+from pydantic import create_model
+from pydantic.fields import SHAPE_LIST, SHAPE_SINGLETON
 from pydantic.main import BaseModel
 
+from counts import CountMode
+
 
 def _remove_fields(model, fields_to_remove: List):
     model.__fields__.pop('id', None)
@@ -25,11 +29,36 @@ def make_add_model(model: BaseModel, fields_to_remove: List[str] = None) -> Base
     return type(f'Add{model.__name__}Model', (BaseModel,), dict(model.__dict__))
 
 
-def create_pagination_model(entity_type: Type['BaseModel']) -> BaseModel:
+_partial_models: Dict[Type['BaseModel'], Type['BaseModel']] = {}
+
+
+def make_partial_model(model: Type['BaseModel']) -> Type['BaseModel']:
+    """Copy of the model, and of the models nested in it, where every field is optional"""
+    if model not in _partial_models:
+        fields = {}
+        for name, field in model.__fields__.items():
+            field_type = field.outer_type_
+            if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+                nested_model = make_partial_model(field.type_)
+                if field.shape == SHAPE_LIST:
+                    field_type = List[nested_model]
+                elif field.shape == SHAPE_SINGLETON:
+                    field_type = nested_model
+            fields[name] = (Optional[field_type], None)
+        _partial_models[model] = create_model(f'Partial{model.__name__}', **fields)
+    return _partial_models[model]
+
+
+def create_pagination_model(entity_type: Type['BaseModel'], partial_items: bool = False) -> BaseModel:
+    # Pages built by utils.paginate leave out the relationships that are not expanded and the fields not selected
+    item_type = make_partial_model(entity_type) if partial_items else entity_type
+
     class PaginationModel(BaseModel):
-        total_size: int
-        page_number: int
+        total_size: Optional[int]
+        total_size_kind: Optional[CountMode]
+        page_number: Optional[int]
         page_size: int
-        items: List[entity_type]
+        next_cursor: Optional[str]
+        items: List[item_type]
 
     return type(f'Paginate{entity_type.__name__}', (BaseModel,), dict(PaginationModel.__dict__))
@@ -1,4 +1,4 @@
-from typing import List, Any
+from typing import List, Any, Optional
 
 from pydantic.main import BaseModel
 from pydantic_sqlalchemy import sqlalchemy_to_pydantic
@@ -28,6 +28,11 @@ class UserModel(BaseModel):
     last_name: str
     email: str
     contact_infos: List[ContactInfoModel]
+    permissions: List[str] = []
+
+
+class TokenUserModel(BaseModel):
+    id: int
     permissions: List[str]
 
 
@@ -87,3 +92,13 @@ ChangeBuildingTypeModel = make_change_model(sqlalchemy_to_pydantic(BuildingType)
 ChangeBuildingModel = make_change_model(sqlalchemy_to_pydantic(Building))
 ChangeFloorModel = make_change_model(sqlalchemy_to_pydantic(Floor))
 ChangeRoomModel = make_change_model(sqlalchemy_to_pydantic(Room))
+
+
+class LocationHeadcountModel(HeadcountModel):
+    location_id: int
+    name: Optional[str]
+
+
+class BuildingTypeHeadcountModel(HeadcountModel):
+    building_type_id: int
+    name: str
@@ -1,17 +1,22 @@
 from datetime import datetime
-from typing import List, Optional
+from decimal import Decimal
+from typing import List, Optional, Dict, Any
 
 from pydantic.main import BaseModel
 from pydantic_sqlalchemy import sqlalchemy_to_pydantic
 
 from models.metrics import Meter, ElectricityMeter, MeterSnapshot, HeatMeterSnapshot, \
-    ElectricityMeterSnapshot, EnvironmentalReading
+    ElectricityMeterSnapshot, EnvironmentalReading, MeterConsumptionRollup
 from request_models import make_change_model, make_add_model
+from downsampling import DownsampleMethod
+from resampling import ResampleMethod
+from series import ConsumptionBucket, SeriesField
 
 ElectricityMeterModel = sqlalchemy_to_pydantic(ElectricityMeter)
 HeatMeterSnapshotModel = sqlalchemy_to_pydantic(HeatMeterSnapshot)
 ElectricityMeterSnapshotModel = sqlalchemy_to_pydantic(ElectricityMeterSnapshot)
 EnvironmentalReadingModel = sqlalchemy_to_pydantic(EnvironmentalReading)
+MeterConsumptionRollupModel = sqlalchemy_to_pydantic(MeterConsumptionRollup)
 
 
 class MeterSnapshotModel(sqlalchemy_to_pydantic(MeterSnapshot)):
@@ -67,6 +72,23 @@ class AddAutoMeterSnapshotModel(make_add_model(sqlalchemy_to_pydantic(MeterSnaps
     electricity: Optional[AddElectricityMeterSnapshotModel]
 
 
+class AddAutoMeterSnapshotBatchModel(BaseModel):
+    snapshots: List[Dict[str, Any]]
+
+
+class MeterSnapshotBatchItemModel(BaseModel):
+    index: int
+    success: bool
+    id: Optional[int]
+    detail: Optional[str]
+
+
+class MeterSnapshotBatchModel(BaseModel):
+    created: int
+    failed: int
+    items: List[MeterSnapshotBatchItemModel]
+
+
 ChangeHeatMeterSnapshotModel = make_change_model(sqlalchemy_to_pydantic(HeatMeterSnapshot))
 ChangeElectricityMeterSnapshotModel = make_change_model(sqlalchemy_to_pydantic(ElectricityMeterSnapshot))
 ChangeEnvironmentalReadingModel = make_change_model(sqlalchemy_to_pydantic(EnvironmentalReading),
@@ -77,3 +99,53 @@ class ChangeMeterSnapshotModel(make_change_model(sqlalchemy_to_pydantic(MeterSna
                                                  fields_to_remove=['meter_id', 'automatic'])):
     heat: Optional[ChangeHeatMeterSnapshotModel]
     electricity: Optional[ChangeElectricityMeterSnapshotModel]
+
+
+class ConsumptionBucketModel(BaseModel):
+    bucket: datetime
+    consumption: Decimal
+    samples: int
+
+
+class MeterConsumptionModel(BaseModel):
+    meter_id: int
+    bucket: ConsumptionBucket
+    start: datetime
+    end: datetime
+    items: List[ConsumptionBucketModel]
+
+
+class MeterStatisticsModel(BaseModel):
+    meter_id: int
+    field: SeriesField
+    start: datetime
+    end: datetime
+    count: Optional[int]
+    min: Optional[Decimal]
+    max: Optional[Decimal]
+    avg: Optional[Decimal]
+    median: Optional[Decimal]
+    mode: Optional[Decimal]
+    first: Optional[Decimal]
+    last: Optional[Decimal]
+
+
+class MeterResampleModel(BaseModel):
+    meter_id: int
+    field: SeriesField
+    method: ResampleMethod
+    start: datetime
+    end: datetime
+    interval: float
+    values: List[Optional[float]]
+    gaps: List[bool]
+
+
+class MeterSeriesModel(BaseModel):
+    meter_id: int
+    field: SeriesField
+    start: datetime
+    end: datetime
+    downsample: Optional[DownsampleMethod]
+    times: List[float]
+    values: List[float]
@@ -0,0 +1,48 @@
+import enum
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class ResampleMethod(str, enum.Enum):
+    Linear = 'linear'
+    Step = 'step'
+
+
+def resample(times: np.ndarray, values: np.ndarray, start: float, end: float, interval: float,
+             method: ResampleMethod, max_gap: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Samples an irregular series on the grid start, start + interval, ... < end.
+
+    Linear interpolation uses the samples on either side of a grid point, step interpolation holds the last sample
+    before it. A grid point is a gap when those samples are more than max_gap seconds apart (for step, when the last
+    sample is older than max_gap) or when the series does not cover it; its value is NaN.
+    Returns the values and the gap flags.
+    """
+    grid = np.arange(start, end, interval, dtype=np.float64)
+    if not len(times):
+        return np.full(len(grid), np.nan), np.ones(len(grid), dtype=bool)
+
+    # Index of the last sample at or before every grid point, -1 when there is none
+    previous = np.searchsorted(times, grid, side='right') - 1
+    has_previous = previous >= 0
+    previous_times = times[np.clip(previous, 0, None)]
+
+    if method == ResampleMethod.Step:
+        resampled = values[np.clip(previous, 0, None)]
+        gaps = ~has_previous
+        if max_gap is not None:
+            gaps |= grid - previous_times > max_gap
+    else:
+        resampled = np.interp(grid, times, values)
+        following = previous + 1
+        has_following = following < len(times)
+        following_times = times[np.clip(following, None, len(times) - 1)]
+        # A grid point that falls exactly on the last sample needs no sample after it
+        exact = has_previous & (previous_times == grid)
+        gaps = ~has_previous | (~has_following & ~exact)
+        if max_gap is not None:
+            gaps |= ~exact & has_following & (following_times - previous_times > max_gap)
+
+    resampled = np.where(gaps, np.nan, resampled)
+    return resampled, gaps
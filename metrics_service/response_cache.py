@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from os import environ
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request
+from starlette.responses import Response
+
+from db import Base
+
+RESPONSE_CACHE_MAX_BYTES = int(environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# Versions are bumped in the process handling the write only, the TTL bounds how stale other workers can get
+RESPONSE_CACHE_TTL = float(environ.get('RESPONSE_CACHE_TTL', 300))
+
+# Tables written only by the routes in routes/locations, which bump their versions
+VERSIONED_TABLES = frozenset({
+    'locations', 'building_types', 'buildings', 'floors', 'floor_items', 'rooms', 'responsible_users'
+})
+
+
+@lru_cache(maxsize=None)
+def dependent_tables(table: str) -> FrozenSet[str]:
+    """Tables whose rows change along with the table through ON DELETE CASCADE or SET NULL"""
+    dependents = set()
+    for other in Base.metadata.tables.values():
+        ondelete = {key.ondelete for key in other.foreign_keys if key.column.table.name == table and key.ondelete}
+        if other.name == table or not ondelete:
+            continue
+        dependents.add(other.name)
+        if 'CASCADE' in ondelete:
+            dependents |= dependent_tables(other.name)
+    return frozenset(dependents)
+
+
+class TableVersions:
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tables: Iterable[str]) -> Tuple[Tuple[str, int], ...]:
+        return tuple((table, self._versions.get(table, 0)) for table in sorted(tables))
+
+    def bump(self, table: str):
+        with self._lock:
+            for name in {table, *dependent_tables(table)}:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+
+table_versions = TableVersions()
+
+
+def bump_versions(table: str):
+    table_versions.bump(table)
+
+
+class ResponseCache:
+    """LRU cache of rendered responses, bounded by the total size of their bodies"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Response]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        body, status_code, media_type, _ = entry
+        return Response(content=body, status_code=status_code, media_type=media_type)
+
+    def set(self, key: Hashable, response: Response):
+        if len(response.body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (response.body, response.status_code, response.media_type,
+                                  time.monotonic() + self.ttl)
+            self.size += len(response.body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        body = self._entries.pop(key)[0]
+        self.size -= len(body)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'size_bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+response_cache = ResponseCache(max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL)
+
+
+def cache_key(request: Request, tables: Iterable[str]) -> Hashable:
+    user = getattr(request.state, 'user', None)
+    if getattr(request.state, 'is_server', False):
+        permissions = 'server'
+    else:
+        permissions = frozenset(user.permissions) if user else None
+    query = tuple(sorted(request.query_params.multi_items()))
+    return request.url.path, query, permissions, table_versions.get(tables)
+
+
+def cached_response(request: Request, tables: Iterable[str], build: Callable[[], Response]) -> Response:
+    """
+    Returns the cached response for the request or caches the one build renders. Responses reading any table other
+    than the versioned ones are never cached, nothing would invalidate them.
+    """
+    tables = frozenset(tables)
+    if not tables <= VERSIONED_TABLES:
+        return build()
+    key = cache_key(request, tables)
+    response = response_cache.get(key)
+    if response is None:
+        response = build()
+        if response.status_code == 200:
+            response_cache.set(key, response)
+    return response
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, case, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert
+from sqlalchemy.orm import Session
+
+from models.metrics import MeterConsumptionRollup, MeterSnapshot, RollupGranularity
+
+rollups = MeterConsumptionRollup.__table__
+snapshots = MeterSnapshot.__table__
+
+
+def sample_time(snapshot: Dict[str, Any]) -> datetime:
+    return snapshot.get('current_time') or snapshot.get('creation_date')
+
+
+def bucket_start(time: datetime, granularity: RollupGranularity) -> datetime:
+    bucket = time.replace(minute=0, second=0, microsecond=0)
+    if granularity in (RollupGranularity.Day, RollupGranularity.Month):
+        bucket = bucket.replace(hour=0)
+    if granularity == RollupGranularity.Month:
+        bucket = bucket.replace(day=1)
+    return bucket
+
+
+def bucket_end(bucket: datetime, granularity: RollupGranularity) -> datetime:
+    if granularity == RollupGranularity.Hour:
+        return bucket + timedelta(hours=1)
+    if granularity == RollupGranularity.Day:
+        return bucket + timedelta(days=1)
+    return (bucket + timedelta(days=32)).replace(day=1)
+
+
+def _merge(rollup: Dict[str, Any], other: Dict[str, Any]):
+    if other['first_time'] < rollup['first_time']:
+        rollup['first_time'] = other['first_time']
+        rollup['first_consumption'] = other['first_consumption']
+    if other['last_time'] >= rollup['last_time']:
+        rollup['last_time'] = other['last_time']
+        rollup['last_consumption'] = other['last_consumption']
+    rollup['min_consumption'] = min(rollup['min_consumption'], other['min_consumption'])
+    rollup['max_consumption'] = max(rollup['max_consumption'], other['max_consumption'])
+    rollup['delta'] = rollup['last_consumption'] - rollup['first_consumption']
+    rollup['sample_count'] += other['sample_count']
+
+
+def add_to_rollups(db: Session, snapshot_dicts: Iterable[Dict[str, Any]]):
+    """Folds freshly inserted snapshots into every rollup granularity with a single upsert."""
+    rows = {}
+    for snapshot in snapshot_dicts:
+        time = sample_time(snapshot)
+        for granularity in RollupGranularity:
+            key = (snapshot['meter_id'], granularity, bucket_start(time, granularity))
+            row = {
+                'meter_id': key[0],
+                'granularity': key[1],
+                'bucket': key[2],
+                'first_time': time,
+                'first_consumption': snapshot['consumption'],
+                'last_time': time,
+                'last_consumption': snapshot['consumption'],
+                'min_consumption': snapshot['consumption'],
+                'max_consumption': snapshot['consumption'],
+                'delta': 0,
+                'sample_count': 1,
+            }
+            if key in rows:
+                _merge(rows[key], row)
+            else:
+                rows[key] = row
+    if not rows:
+        return
+
+    statement = insert(rollups).values(list(rows.values()))
+    new = statement.excluded
+    is_earlier = new.first_time < rollups.c.first_time
+    is_later = new.last_time >= rollups.c.last_time
+    first_consumption = case([(is_earlier, new.first_consumption)], else_=rollups.c.first_consumption)
+    last_consumption = case([(is_later, new.last_consumption)], else_=rollups.c.last_consumption)
+    db.execute(statement.on_conflict_do_update(
+        constraint='_meter_rollup_bucket_uc',
+        set_={
+            'first_time': case([(is_earlier, new.first_time)], else_=rollups.c.first_time),
+            'first_consumption': first_consumption,
+            'last_time': case([(is_later, new.last_time)], else_=rollups.c.last_time),
+            'last_consumption': last_consumption,
+            'min_consumption': func.least(rollups.c.min_consumption, new.min_consumption),
+            'max_consumption': func.greatest(rollups.c.max_consumption, new.max_consumption),
+            'delta': last_consumption - first_consumption,
+            'sample_count': rollups.c.sample_count + new.sample_count,
+        }
+    ))
+
+
+def _recompute_bucket(db: Session, meter_id: int, granularity: RollupGranularity, bucket: datetime):
+    time = func.coalesce(snapshots.c.current_time, snapshots.c.creation_date)
+    first_consumption = func.array_agg(aggregate_order_by(snapshots.c.consumption, time.asc()))[1]
+    last_consumption = func.array_agg(aggregate_order_by(snapshots.c.consumption, time.desc()))[1]
+    samples = select([
+        snapshots.c.meter_id,
+        cast(literal(granularity.name), rollups.c.granularity.type),
+        cast(literal(bucket), rollups.c.bucket.type),
+        func.min(time),
+        first_consumption,
+        func.max(time),
+        last_consumption,
+        func.min(snapshots.c.consumption),
+        func.max(snapshots.c.consumption),
+        last_consumption - first_consumption,
+        func.count(),
+    ]).where(and_(
+        snapshots.c.meter_id == meter_id,
+        time >= bucket,
+        time < bucket_end(bucket, granularity),
+    )).group_by(snapshots.c.meter_id)
+
+    db.execute(rollups.delete().where(and_(
+        rollups.c.meter_id == meter_id,
+        rollups.c.granularity == granularity,
+        rollups.c.bucket == bucket,
+    )))
+    statement = insert(rollups).from_select([
+        'meter_id', 'granularity', 'bucket', 'first_time', 'first_consumption', 'last_time', 'last_consumption',
+        'min_consumption', 'max_consumption', 'delta', 'sample_count',
+    ], samples)
+    db.execute(statement.on_conflict_do_update(
+        constraint='_meter_rollup_bucket_uc',
+        set_={column: getattr(statement.excluded, column) for column in (
+            'first_time', 'first_consumption', 'last_time', 'last_consumption', 'min_consumption',
+            'max_consumption', 'delta', 'sample_count',
+        )}
+    ))
+
+
+def refresh_rollups(db: Session, samples: Iterable[Tuple[int, datetime]]):
+    """Recomputes the buckets touched by changed or removed snapshots from the raw data.
+
+    Must run after the change has been flushed so the recomputation sees it.
+    """
+    buckets = set()
+    for meter_id, time in samples:
+        if meter_id is None or time is None:
+            continue
+        for granularity in RollupGranularity:
+            buckets.add((meter_id, granularity, bucket_start(time, granularity)))
+    for meter_id, granularity, bucket in sorted(buckets, key=lambda key: (key[0], key[1].name, key[2])):
+        _recompute_bucket(db, meter_id, granularity, bucket)
+
+
+def snapshot_samples(meter_snapshot: MeterSnapshot) -> List[Tuple[int, datetime]]:
+    return [(meter_snapshot.meter_id, meter_snapshot.current_time or meter_snapshot.creation_date)]
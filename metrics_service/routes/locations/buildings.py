@@ -1,8 +1,9 @@
+from typing import Optional, Tuple
+
 from fastapi import Depends, HTTPException, Request
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from auth_api import get_user
 from db import get_db
 from models import PermissionSet
 from models.location import Building, BuildingType
@@ -10,37 +11,43 @@ from permissions import has_permission
 from request_models import create_pagination_model
 from request_models.location_requests import BuildingModel, AddBuildingModel, ChangeBuildingModel, BuildingTypeModel, \
     AddBuildingTypeModel, BuildingTypeCountModel
+from responses import FastJSONResponse
+from reports import building_type_counts
+from response_cache import bump_versions, cached_response
 from routes import metrics_router
-from utils import paginate, apply_filtering
+from user_directory import get_directory_users
+from utils import paginate, apply_filtering, make_page, get_page, page_tables
 
 
-@metrics_router.get("/building-types/", status_code=200, response_model=create_pagination_model(BuildingTypeModel))
-async def get_building_types(request: Request, db: Session = Depends(get_db), ):
+@metrics_router.get("/building-types/", status_code=200,
+                    response_model=create_pagination_model(BuildingTypeModel, partial_items=True))
+def get_building_types(request: Request, db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.BuildingTypeRead.value)
     return paginate(
         db=db,
         db_model=BuildingType,
         serializer=BuildingTypeModel,
-        request=request
+        request=request,
+        cached=True
     )
 
 
 @metrics_router.get("/building-types/count/", status_code=200,
                     response_model=create_pagination_model(BuildingTypeCountModel))
-async def get_building_types_count(request: Request, db: Session = Depends(get_db)):
+def get_building_types_count(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingTypeRead.value)
-    result_models, count, page_number = apply_filtering(db, BuildingType, request)
-    items = [BuildingTypeCountModel(id=b.id, name=b.name, buildings_count=len(b.buildings)) for b in result_models]
-    return {
-        'total_size': count,
-        'page_number': page_number,
-        'page_size': len(items),
-        'items': items
-    }
+
+    def build():
+        result_models, page_info = apply_filtering(db, BuildingType, request)
+        counts = building_type_counts(db)
+        items = [{'id': b.id, 'name': b.name, 'buildings_count': counts.get(b.id, 0)} for b in result_models]
+        return FastJSONResponse(make_page(page_info, items))
+
+    return cached_response(request, {'building_types', 'buildings'}, build)
 
 
 @metrics_router.post("/building-types/", status_code=201, response_model=BuildingTypeModel)
-async def add_building_type(request: Request, body: AddBuildingTypeModel, db: Session = Depends(get_db)):
+def add_building_type(request: Request, body: AddBuildingTypeModel, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingTypeEdit.value)
     building_type = BuildingType(name=body.name)
     db.add(building_type)
@@ -48,46 +55,85 @@ async def add_building_type(request: Request, body: AddBuildingTypeModel, db: Se
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='BuildingType already exists', status_code=400)
+    bump_versions('building_types')
     return BuildingTypeModel.from_orm(building_type)
 
 
 @metrics_router.patch("/building-types/{building_type_id}", status_code=200, response_model=BuildingTypeModel)
-async def patch_building_type(request: Request, building_type_id: int, body: AddBuildingTypeModel,
-                              db: Session = Depends(get_db), ):
+def patch_building_type(request: Request, building_type_id: int, body: AddBuildingTypeModel,
+                        db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.BuildingTypeEdit.value)
     building_type = db.query(BuildingType).filter_by(id=building_type_id).first()
 
     building_type.name = body.name
     db.add(building_type)
     db.commit()
+    bump_versions('building_types')
     return BuildingTypeModel.from_orm(building_type)
 
 
 @metrics_router.delete("/building-types/{building_type_id}/", status_code=200)
-async def remove_building_type(request: Request, building_type_id: int, db: Session = Depends(get_db)):
+def remove_building_type(request: Request, building_type_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingTypeEdit.value)
     db.query(BuildingType).filter_by(id=building_type_id).delete()
     db.commit()
+    bump_versions('building_types')
     return ""
 
 
-@metrics_router.get("/buildings/", status_code=200, response_model=create_pagination_model(BuildingModel))
-async def get_buildings(request: Request, db: Session = Depends(get_db)):
+def _responsible_people_fields(fields: Optional[str]) -> Tuple[Optional[str], bool, bool]:
+    """
+    Responsible people have no user relationship, their user is attached from the user directory. Returns the fields
+    to read from the database, whether responsible_people.user is selected and whether responsible_people.user_id is.
+    """
+    paths = [path.strip() for path in fields.split(',')] if fields else []
+    if not any(path.startswith('responsible_people.') for path in paths):
+        return fields, True, True
+    with_user = any(path == 'responsible_people.user' or path.startswith('responsible_people.user.')
+                    for path in paths)
+    with_user_id = 'responsible_people.user_id' in paths
+    paths = [path for path in paths
+             if path != 'responsible_people.user' and not path.startswith('responsible_people.user.')]
+    if with_user and not with_user_id:
+        paths.append('responsible_people.user_id')
+    return ','.join(paths), with_user, with_user_id
+
+
+@metrics_router.get("/buildings/", status_code=200,
+                    response_model=create_pagination_model(BuildingModel, partial_items=True))
+def get_buildings(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingRead.value)
-    paginated = paginate(
-        db=db,
-        db_model=Building,
-        serializer=BuildingModel,
-        request=request
-    )
-    for index, building in enumerate(paginated['items']):
-        for user in building.responsible_people:
-            user.user = get_user(user.user_id)
-    return paginated
+    fields, with_user, with_user_id = _responsible_people_fields(request.query_params.get('fields'))
+
+    def build():
+        page = get_page(
+            db=db,
+            db_model=Building,
+            serializer=BuildingModel,
+            request=request,
+            fields=fields
+        )
+        responsible_people = [person for building in page['items']
+                              for person in building.get('responsible_people', [])]
+        users = {}
+        if with_user and responsible_people:
+            users = get_directory_users(db, (person['user_id'] for person in responsible_people))
+        for person in responsible_people:
+            if with_user:
+                person['user'] = users.get(person['user_id'])
+            if not with_user_id:
+                del person['user_id']
+        return FastJSONResponse(page)
+
+    tables = page_tables(Building, BuildingModel, request, fields=fields)
+    if with_user and 'responsible_users' in tables:
+        # Users come from the replicated user directory, which the versions do not track
+        tables.add('user_replicas')
+    return cached_response(request, tables, build)
 
 
 @metrics_router.post("/buildings/", status_code=201, response_model=BuildingModel)
-async def add_building(request: Request, body: AddBuildingModel, db: Session = Depends(get_db)):
+def add_building(request: Request, body: AddBuildingModel, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingEdit.value)
     building = Building(**body.dict())
     db.add(building)
@@ -95,12 +141,13 @@ async def add_building(request: Request, body: AddBuildingModel, db: Session = D
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Building already exists', status_code=400)
+    bump_versions('buildings')
     return BuildingModel.from_orm(building)
 
 
 @metrics_router.patch("/buildings/{building_id}", status_code=200, response_model=BuildingModel)
-async def patch_building(request: Request, building_id: int, body: ChangeBuildingModel,
-                         db: Session = Depends(get_db)):
+def patch_building(request: Request, building_id: int, body: ChangeBuildingModel,
+                   db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingEdit.value)
     building = db.query(Building).filter_by(id=building_id).first()
 
@@ -111,12 +158,14 @@ async def patch_building(request: Request, building_id: int, body: ChangeBuildin
 
         db.add(building)
         db.commit()
+        bump_versions('buildings')
     return BuildingModel.from_orm(building)
 
 
 @metrics_router.delete("/buildings/{building_id}/", status_code=200)
-async def remove_building(request: Request, building_id: int, db: Session = Depends(get_db)):
+def remove_building(request: Request, building_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.BuildingEdit.value)
     db.query(Building).filter_by(id=building_id).delete()
     db.commit()
+    bump_versions('buildings')
     return ""
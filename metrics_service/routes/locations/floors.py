@@ -11,23 +11,25 @@ from permissions import has_permission
 from request_models import create_pagination_model
 from request_models.location_requests import FloorModel, AddFloorModel, ChangeFloorModel, AddFloorPlanItemModel, \
     FloorPlanItemModel
+from response_cache import bump_versions
 from routes import metrics_router
 from utils import paginate
 
 
-@metrics_router.get("/floors/", status_code=200, response_model=create_pagination_model(FloorModel))
-async def get_floors(request: Request, db: Session = Depends(get_db)):
+@metrics_router.get("/floors/", status_code=200, response_model=create_pagination_model(FloorModel, partial_items=True))
+def get_floors(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.FloorRead.value)
     return paginate(
         db=db,
         db_model=Floor,
         serializer=FloorModel,
-        request=request
+        request=request,
+        cached=True
     )
 
 
 @metrics_router.post("/floors/", status_code=201, response_model=FloorModel)
-async def add_floor(request: Request, body: AddFloorModel, db: Session = Depends(get_db)):
+def add_floor(request: Request, body: AddFloorModel, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.FloorEdit.value)
     floor = Floor(**body.dict())
     db.add(floor)
@@ -35,11 +37,12 @@ async def add_floor(request: Request, body: AddFloorModel, db: Session = Depends
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Floor already exists', status_code=400)
+    bump_versions('floors')
     return FloorModel.from_orm(floor)
 
 
 @metrics_router.patch("/floors/{floor_id}", status_code=200, response_model=FloorModel)
-async def patch_floor(request: Request, floor_id: int, body: ChangeFloorModel, db: Session = Depends(get_db), ):
+def patch_floor(request: Request, floor_id: int, body: ChangeFloorModel, db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.FloorEdit.value)
     floor = db.query(Floor).filter_by(id=floor_id).first()
     if not floor:
@@ -52,19 +55,21 @@ async def patch_floor(request: Request, floor_id: int, body: ChangeFloorModel, d
 
         db.add(floor)
         db.commit()
+        bump_versions('floors')
     return FloorModel.from_orm(floor)
 
 
 @metrics_router.delete("/floors/{floor_id}/", status_code=200)
-async def remove_floor(request: Request, floor_id: int, db: Session = Depends(get_db)):
+def remove_floor(request: Request, floor_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.FloorEdit.value)
     db.query(Floor).filter_by(id=floor_id).delete()
     db.commit()
+    bump_versions('floors')
     return ""
 
 
 @metrics_router.post("/floor-plan-items/", status_code=201, response_model=FloorPlanItemModel)
-async def add_floor_plan_item(request: Request, body: AddFloorPlanItemModel, db: Session = Depends(get_db), ):
+def add_floor_plan_item(request: Request, body: AddFloorPlanItemModel, db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.FloorEdit.value)
     if not (floor := db.query(Floor).filter_by(id=body.floor_id).first()):
         raise HTTPException(detail='Floor does not exist', status_code=404)
@@ -82,13 +87,15 @@ async def add_floor_plan_item(request: Request, body: AddFloorPlanItemModel, db:
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='FloorPlanItem already exists', status_code=400)
+    bump_versions('floor_items')
     return FloorPlanItemModel.from_orm(floor_plan_item)
 
 
 @metrics_router.delete("/floor-plan-items/{floor_plan_item_id}/", status_code=200)
-async def remove_floor_plan_item(request: Request, floor_plan_item_id: int, db: Session = Depends(get_db),
-                                 ):
+def remove_floor_plan_item(request: Request, floor_plan_item_id: int, db: Session = Depends(get_db),
+                           ):
     has_permission(request, PermissionSet.FloorEdit.value)
     db.query(FloorPlanItem).filter_by(id=floor_plan_item_id).delete()
     db.commit()
+    bump_versions('floor_items')
     return ""
@@ -6,40 +6,49 @@ from sqlalchemy.orm import Session
 
 from db import get_db
 from models import PermissionSet
-from models.location import Building, Location
+from models.location import Location
 from permissions import has_permission
 from request_models import create_pagination_model
-from request_models.location_requests import LocationModel, AddLocationModel, ChangeLocationModel, HeadcountModel
+from request_models.location_requests import LocationModel, AddLocationModel, ChangeLocationModel, HeadcountModel, \
+    LocationHeadcountModel, BuildingTypeHeadcountModel
+from reports import headcount, headcount_by_location, headcount_by_building_type
+from response_cache import bump_versions
 from routes import metrics_router
 from utils import paginate
 
 
 @metrics_router.get("/headcount/", status_code=200, response_model=HeadcountModel)
-async def get_headcount(db: Session = Depends(get_db)):
-    buildings: List[Building] = db.query(Building).all()
-    model = HeadcountModel()
-    for building in buildings:
-        model.living += building.living_quantity
-        studying = building.studying_daytime + building.studying_evening_time + building.studying_part_time
-        working = building.working_help + building.working_science + building.working_teachers
-        model.studying += studying
-        model.personnel += working
-    return model
-
-
-@metrics_router.get("/locations/", status_code=200, response_model=create_pagination_model(LocationModel))
-async def get_locations(request: Request, db: Session = Depends(get_db)):
+def get_headcount(db: Session = Depends(get_db)):
+    return headcount(db)
+
+
+@metrics_router.get("/headcount/locations/", status_code=200, response_model=List[LocationHeadcountModel])
+def get_headcount_by_location(request: Request, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.LocationRead.value)
+    return headcount_by_location(db)
+
+
+@metrics_router.get("/headcount/building-types/", status_code=200, response_model=List[BuildingTypeHeadcountModel])
+def get_headcount_by_building_type(request: Request, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.BuildingTypeRead.value)
+    return headcount_by_building_type(db)
+
+
+@metrics_router.get("/locations/", status_code=200,
+                    response_model=create_pagination_model(LocationModel, partial_items=True))
+def get_locations(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.LocationRead.value)
     return paginate(
         db=db,
         db_model=Location,
         serializer=LocationModel,
-        request=request
+        request=request,
+        cached=True
     )
 
 
 @metrics_router.post("/locations/", status_code=201, response_model=LocationModel)
-async def add_location(request: Request, body: AddLocationModel, db: Session = Depends(get_db)):
+def add_location(request: Request, body: AddLocationModel, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.LocationEdit.value)
     location = Location(name=body.name, latitude=body.latitude, longitude=body.longitude)
     db.add(location)
@@ -47,12 +56,13 @@ async def add_location(request: Request, body: AddLocationModel, db: Session = D
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Location already exists', status_code=400)
+    bump_versions('locations')
     return LocationModel.from_orm(location)
 
 
 @metrics_router.patch("/locations/{location_id}", status_code=200, response_model=LocationModel)
-async def patch_location(request: Request, location_id: int, body: ChangeLocationModel,
-                         db: Session = Depends(get_db), ):
+def patch_location(request: Request, location_id: int, body: ChangeLocationModel,
+                   db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.LocationEdit.value)
     location = db.query(Location).filter_by(id=location_id).first()
 
@@ -63,12 +73,14 @@ async def patch_location(request: Request, location_id: int, body: ChangeLocatio
 
         db.add(location)
         db.commit()
+        bump_versions('locations')
     return LocationModel.from_orm(location)
 
 
 @metrics_router.delete("/locations/{location_id}/", status_code=200)
-async def remove_location(request: Request, location_id: int, db: Session = Depends(get_db)):
+def remove_location(request: Request, location_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.LocationEdit.value)
     db.query(Location).filter_by(id=location_id).delete()
     db.commit()
+    bump_versions('locations')
     return ""
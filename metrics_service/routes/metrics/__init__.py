@@ -1 +1 @@
-__all__ = ['devices', 'environmental_readings', 'snapshots']
+__all__ = ['consumption', 'devices', 'environmental_readings', 'monitoring', 'meter_series', 'snapshots', 'statistics']
@@ -0,0 +1,54 @@
+from datetime import datetime
+from os import environ
+
+from fastapi import Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from counts import CountMode
+from db import get_db
+from models import PermissionSet
+from models.metrics import Meter, MeterConsumptionRollup
+from permissions import has_permission
+from request_models import create_pagination_model
+from request_models.metrics_requests import MeterConsumptionRollupModel, MeterConsumptionModel
+from routes import metrics_router
+from series import ConsumptionBucket, bucket_count, consumption_series, to_naive_utc
+from utils import paginate
+
+MAX_CONSUMPTION_BUCKETS = int(environ.get('MAX_CONSUMPTION_BUCKETS', 10000))
+
+
+@metrics_router.get("/meter-consumption-rollups/", status_code=200,
+                    response_model=create_pagination_model(MeterConsumptionRollupModel, partial_items=True))
+def get_meter_consumption_rollups(request: Request, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    return paginate(
+        db=db,
+        db_model=MeterConsumptionRollup,
+        serializer=MeterConsumptionRollupModel,
+        request=request,
+        count_mode=CountMode.Cached
+    )
+
+
+@metrics_router.get("/meters/{meter_id}/consumption/", status_code=200, response_model=MeterConsumptionModel)
+def get_meter_consumption(request: Request, meter_id: int, start: datetime = Query(..., alias='from'),
+                          end: datetime = Query(None, alias='to'),
+                          bucket: ConsumptionBucket = ConsumptionBucket.Hour, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    start = to_naive_utc(start)
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    if start >= end:
+        raise HTTPException(detail='"from" must be earlier than "to"', status_code=400)
+    if bucket_count(start, end, bucket) > MAX_CONSUMPTION_BUCKETS:
+        raise HTTPException(detail=f'Range is limited to {MAX_CONSUMPTION_BUCKETS} buckets', status_code=400)
+    if not db.query(Meter.id).filter_by(id=meter_id).first():
+        raise HTTPException(detail='Meter does not exist', status_code=404)
+
+    return {
+        'meter_id': meter_id,
+        'bucket': bucket,
+        'start': start,
+        'end': end,
+        'items': consumption_series(db, meter_id, start, end, bucket)
+    }
@@ -3,6 +3,7 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from db import get_db
+from meter_keys import get_meter_id_by_recognition_key, invalidate_meter_keys
 from models import PermissionSet
 from models.metrics import Meter, ElectricityMeter, MeterType
 from permissions import has_permission
@@ -14,26 +15,26 @@ from utils import paginate
 
 
 @metrics_router.get("/meters/recognize/{recognition_key}/", status_code=201, response_model=RecognizeMeterModel)
-async def recognize_meter(recognition_key: str, db: Session = Depends(get_db)):
-    meter = db.query(Meter).filter(Meter.recognition_key == recognition_key).first()
-    if not meter:
+def recognize_meter(recognition_key: str, db: Session = Depends(get_db)):
+    if not get_meter_id_by_recognition_key(db, recognition_key):
         return {'meter_exists': False}
     return {'meter_exists': True}
 
 
-@metrics_router.get("/meters/", status_code=200, response_model=create_pagination_model(MeterModel))
-async def get_meters(request: Request, db: Session = Depends(get_db)):
+@metrics_router.get("/meters/", status_code=200, response_model=create_pagination_model(MeterModel, partial_items=True))
+def get_meters(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.MeterRead.value)
     return paginate(
         db=db,
         db_model=Meter,
         serializer=MeterModel,
-        request=request
+        request=request,
+        default_expand='electricity'
     )
 
 
 @metrics_router.post("/meters/", status_code=201, response_model=MeterModel)
-async def add_meter(request: Request, body: AddMeterModel, db: Session = Depends(get_db)):
+def add_meter(request: Request, body: AddMeterModel, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.MeterEdit.value)
     meter_dict = body.dict()
     electricity = None
@@ -51,12 +52,13 @@ async def add_meter(request: Request, body: AddMeterModel, db: Session = Depends
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Bad info', status_code=400)
+    invalidate_meter_keys(keys=[meter.secret_key, meter.recognition_key])
 
     return MeterModel.from_orm(meter)
 
 
 @metrics_router.patch("/meters/{meter_id}", status_code=200, response_model=MeterModel)
-async def patch_meter(request: Request, meter_id: int, body: ChangeMeterModel, db: Session = Depends(get_db),):
+def patch_meter(request: Request, meter_id: int, body: ChangeMeterModel, db: Session = Depends(get_db),):
     has_permission(request, PermissionSet.MeterEdit.value)
     meter = db.query(Meter).filter_by(id=meter_id).first()
 
@@ -83,12 +85,14 @@ async def patch_meter(request: Request, meter_id: int, body: ChangeMeterModel, d
 
     db.merge(meter)
     db.commit()
+    invalidate_meter_keys(meter_id, keys=[meter.secret_key, meter.recognition_key])
     return MeterModel.from_orm(meter)
 
 
 @metrics_router.delete("/meters/{meter_id}/", status_code=200)
-async def remove_meter(request: Request, meter_id: int, db: Session = Depends(get_db)):
+def remove_meter(request: Request, meter_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.MeterEdit.value)
     db.query(Meter).filter_by(id=meter_id).delete()
     db.commit()
+    invalidate_meter_keys(meter_id)
     return ""
@@ -1,8 +1,12 @@
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, HTTPException, Query, Request
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
 
+from counts import CountMode
 from db import get_db
+from exports import ExportFormat, reading_export_query, stream_export
+from ingestion import ingestion_buffer
 from models import PermissionSet
 from models.metrics import EnvironmentalReading
 from permissions import has_permission
@@ -14,21 +18,33 @@ from utils import paginate
 
 
 @metrics_router.get("/rooms/environmental-readings/", status_code=200,
-                    response_model=create_pagination_model(EnvironmentalReadingModel))
-async def get_environmental_readings(request: Request, db: Session = Depends(get_db)):
+                    response_model=create_pagination_model(EnvironmentalReadingModel, partial_items=True))
+def get_environmental_readings(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.RoomRead.value)
     return paginate(
         db=db,
         db_model=EnvironmentalReading,
         serializer=EnvironmentalReadingModel,
-        request=request
+        request=request,
+        count_mode=CountMode.Estimated
     )
 
 
+@metrics_router.get("/rooms/environmental-readings/export/", status_code=200)
+def export_environmental_readings(request: Request,
+                                  export_format: ExportFormat = Query(ExportFormat.Ndjson, alias='format')):
+    has_permission(request, PermissionSet.RoomRead.value)
+    return stream_export(reading_export_query(request), export_format, 'environmental_readings')
+
+
 @metrics_router.post("/rooms/environmental-readings/", status_code=201, response_model=EnvironmentalReadingModel)
-async def add_environmental_reading(request: Request, body: AddEnvironmentalReadingModel,
-                                    db: Session = Depends(get_db), ):
+def add_environmental_reading(request: Request, body: AddEnvironmentalReadingModel,
+                              db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.RoomEdit.value)
+    if ingestion_buffer:
+        ingestion_buffer.put('environmental_reading', body)
+        return JSONResponse(content={'detail': 'Accepted'}, status_code=202)
+
     environmental_reading = EnvironmentalReading(**body.dict())
     db.add(environmental_reading)
     try:
@@ -40,8 +56,8 @@ async def add_environmental_reading(request: Request, body: AddEnvironmentalRead
 
 @metrics_router.patch("/rooms/environmental-readings/{environmental_reading_id}", status_code=200,
                       response_model=EnvironmentalReadingModel)
-async def patch_environmental_reading(request: Request, environmental_reading_id: int,
-                                      body: ChangeEnvironmentalReadingModel, db: Session = Depends(get_db), ):
+def patch_environmental_reading(request: Request, environmental_reading_id: int,
+                                body: ChangeEnvironmentalReadingModel, db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.RoomEdit.value)
     environmental_reading = db.query(EnvironmentalReading).filter_by(id=environmental_reading_id).first()
 
@@ -56,7 +72,7 @@ async def patch_environmental_reading(request: Request, environmental_reading_id
 
 
 @metrics_router.delete("/rooms/environmental_readings/{environmental_reading_id}/", status_code=200)
-async def remove_environmental_reading(request: Request, environmental_reading_id: int, db: Session = Depends(get_db)):
+def remove_environmental_reading(request: Request, environmental_reading_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.RoomEdit.value)
     db.query(EnvironmentalReading).filter_by(id=environmental_reading_id).delete()
     db.commit()
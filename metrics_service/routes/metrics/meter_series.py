@@ -0,0 +1,89 @@
+from datetime import datetime
+from os import environ
+
+from fastapi import Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from db import get_db
+from downsampling import DownsampleMethod, downsample
+from models import PermissionSet
+from models.metrics import Meter
+from permissions import has_permission
+from request_models.metrics_requests import MeterResampleModel, MeterSeriesModel
+from resampling import ResampleMethod, resample
+from responses import FastJSONResponse
+from routes import metrics_router
+from series import SeriesField, load_series, to_epoch, to_naive_utc
+
+MAX_RESAMPLE_POINTS = int(environ.get('MAX_RESAMPLE_POINTS', 2000000))
+MAX_CHART_POINTS = int(environ.get('MAX_CHART_POINTS', 100000))
+
+
+def _series_range(start: datetime, end: datetime):
+    start = to_naive_utc(start)
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    if start >= end:
+        raise HTTPException(detail='"from" must be earlier than "to"', status_code=400)
+    return start, end
+
+
+def _check_meter(db: Session, meter_id: int):
+    if not db.query(Meter.id).filter_by(id=meter_id).first():
+        raise HTTPException(detail='Meter does not exist', status_code=404)
+
+
+@metrics_router.get("/meters/{meter_id}/series/", status_code=200, response_model=MeterSeriesModel)
+def get_meter_series(request: Request, meter_id: int, start: datetime = Query(..., alias='from'),
+                     end: datetime = Query(None, alias='to'), field: SeriesField = SeriesField.consumption,
+                     points: int = Query(None, ge=3, le=MAX_CHART_POINTS,
+                                         description='Downsample to at most this many samples'),
+                     downsample_method: DownsampleMethod = Query(DownsampleMethod.Lttb, alias='downsample'),
+                     db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    start, end = _series_range(start, end)
+    _check_meter(db, meter_id)
+
+    times, values = load_series(db, meter_id, start, end, field)
+    if points:
+        times, values = downsample(times, values, points, downsample_method)
+    return FastJSONResponse({
+        'meter_id': meter_id,
+        'field': field,
+        'start': start,
+        'end': end,
+        'downsample': downsample_method if points else None,
+        'times': times,
+        'values': values,
+    })
+
+
+@metrics_router.get("/meters/{meter_id}/resample/", status_code=200, response_model=MeterResampleModel)
+def get_meter_resampled(request: Request, meter_id: int, start: datetime = Query(..., alias='from'),
+                        end: datetime = Query(None, alias='to'), field: SeriesField = SeriesField.consumption,
+                        interval: float = Query(60, gt=0, description='Grid step in seconds'),
+                        method: ResampleMethod = ResampleMethod.Linear,
+                        max_gap: float = Query(None, gt=0, description='Longest interpolated span in seconds'),
+                        points: int = Query(None, ge=1, le=MAX_CHART_POINTS,
+                                            description='Widen the interval to return at most this many points'),
+                        db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    start, end = _series_range(start, end)
+    # The grid has to stay regular, so it is thinned by widening its step rather than by dropping points
+    if points:
+        interval = max(interval, (end - start).total_seconds() / points)
+    if (end - start).total_seconds() / interval > MAX_RESAMPLE_POINTS:
+        raise HTTPException(detail=f'Range is limited to {MAX_RESAMPLE_POINTS} points', status_code=400)
+    _check_meter(db, meter_id)
+
+    times, values = load_series(db, meter_id, start, end, field, with_neighbours=True)
+    resampled, gaps = resample(times, values, to_epoch(start), to_epoch(end), interval, method, max_gap)
+    return FastJSONResponse({
+        'meter_id': meter_id,
+        'field': field,
+        'method': method,
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'values': resampled,
+        'gaps': gaps,
+    })
@@ -0,0 +1,28 @@
+from fastapi import Request
+
+from common.service_client import service_client_stats
+from ingestion import ingestion_buffer, INGESTION_MODE
+from models import PermissionSet
+from permissions import has_permission
+from response_cache import response_cache
+from routes import metrics_router
+
+
+@metrics_router.get("/ingestion/stats/", status_code=200)
+def get_ingestion_stats(request: Request):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    if not ingestion_buffer:
+        return {'mode': INGESTION_MODE}
+    return ingestion_buffer.stats()
+
+
+@metrics_router.get("/service-clients/stats/", status_code=200)
+def get_service_client_stats(request: Request):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    return service_client_stats()
+
+
+@metrics_router.get("/response-cache/stats/", status_code=200)
+def get_response_cache_stats(request: Request):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    return response_cache.stats()
@@ -1,35 +1,59 @@
-from fastapi import Depends, HTTPException, Header, Request
+from datetime import datetime
+from os import environ
+
+from fastapi import Depends, HTTPException, Header, Query, Request
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse
 
+from counts import CountMode
 from db import get_db
+from exports import COLUMNAR_FORMATS, ExportFormat, snapshot_export_query, stream_export
+from ingestion import save_meter_snapshots, ingestion_buffer
+from meter_keys import get_meter_id_by_secret_key, resolve_secret_keys
 from models import PermissionSet
 from models.metrics import MeterSnapshot, HeatMeterSnapshot, \
-    ElectricityMeterSnapshot, MeterType, Meter
+    ElectricityMeterSnapshot, MeterType
 from permissions import has_permission
 from request_models import create_pagination_model
 from request_models.metrics_requests import MeterSnapshotModel, AddMeterSnapshotModel, ChangeMeterSnapshotModel, \
-    AddAutoMeterSnapshotModel
+    AddAutoMeterSnapshotModel, AddAutoMeterSnapshotBatchModel, MeterSnapshotBatchModel
+from rollups import add_to_rollups, refresh_rollups, snapshot_samples
 from routes import metrics_router
 from utils import paginate
 
+MAX_SNAPSHOT_BATCH_SIZE = int(environ.get('MAX_SNAPSHOT_BATCH_SIZE', 1000))
+
 
-@metrics_router.get("/meter-snapshots/", status_code=200, response_model=create_pagination_model(MeterSnapshotModel))
-async def get_meter_snapshots(request: Request, db: Session = Depends(get_db)):
+@metrics_router.get("/meter-snapshots/", status_code=200,
+                    response_model=create_pagination_model(MeterSnapshotModel, partial_items=True))
+def get_meter_snapshots(request: Request, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.MeterSnapshotRead.value)
     return paginate(
         db=db,
         db_model=MeterSnapshot,
         serializer=MeterSnapshotModel,
-        request=request
+        request=request,
+        count_mode=CountMode.Estimated,
+        default_expand='heat_meter_snapshot,electricity_meter_snapshot'
     )
 
 
+@metrics_router.get("/meter-snapshots/export/", status_code=200)
+def export_meter_snapshots(request: Request, export_format: ExportFormat = Query(ExportFormat.Ndjson, alias='format')):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    # Columnar exports carry the meter metadata along, it is dictionary-encoded so the repeated values stay cheap
+    query = snapshot_export_query(request, with_meter=export_format in COLUMNAR_FORMATS)
+    return stream_export(query, export_format, 'meter_snapshots')
+
+
 @metrics_router.post("/meter-snapshots/", status_code=201, response_model=MeterSnapshotModel)
-async def add_meter_snapshot(request: Request, body: AddMeterSnapshotModel, db: Session = Depends(get_db), ):
+def add_meter_snapshot(request: Request, body: AddMeterSnapshotModel, db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.MeterSnapshotEdit.value)
     snapshot_dict = body.dict()
     snapshot_dict['automatic'] = False
+    snapshot_dict['creation_date'] = snapshot_dict['creation_date'] or datetime.utcnow()
     heat_dict = snapshot_dict.pop('heat', {})
     electricity_dict = snapshot_dict.pop('electricity', {})
 
@@ -43,6 +67,7 @@ async def add_meter_snapshot(request: Request, body: AddMeterSnapshotModel, db:
     db.add(meter_snapshot)
 
     try:
+        add_to_rollups(db, [snapshot_dict])
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Bad info', status_code=400)
@@ -51,16 +76,24 @@ async def add_meter_snapshot(request: Request, body: AddMeterSnapshotModel, db:
 
 
 @metrics_router.post("/meter-snapshots/auto/", status_code=201, response_model=MeterSnapshotModel)
-async def add_meter_snapshot_auto(body: AddAutoMeterSnapshotModel, db: Session = Depends(get_db),
-                                  secret_key: str = Header(None)):
-    meter = db.query(Meter).filter(Meter.secret_key == secret_key).first()
-    if not meter:
+def add_meter_snapshot_auto(body: AddAutoMeterSnapshotModel, db: Session = Depends(get_db),
+                            secret_key: str = Header(None)):
+    meter_id = get_meter_id_by_secret_key(db, secret_key)
+    if not meter_id:
         raise HTTPException(status_code=400, detail="Wrong secret key")
     automatic = True
 
     snapshot_dict = body.dict()
+    snapshot_dict['meter_id'] = meter_id
+    snapshot_dict['creation_date'] = snapshot_dict['creation_date'] or datetime.utcnow()
+
+    if ingestion_buffer:
+        if body.type == MeterType.Electricity and not body.electricity:
+            raise HTTPException(status_code=400, detail='Electricity info is needed')
+        ingestion_buffer.put('snapshot', AddMeterSnapshotModel(**snapshot_dict))
+        return JSONResponse(content={'detail': 'Accepted'}, status_code=202)
+
     snapshot_dict['automatic'] = automatic
-    snapshot_dict['meter_id'] = meter.id
     heat_dict = snapshot_dict.pop('heat', {})
     electricity_dict = snapshot_dict.pop('electricity', {})
 
@@ -74,6 +107,7 @@ async def add_meter_snapshot_auto(body: AddAutoMeterSnapshotModel, db: Session =
     db.add(meter_snapshot)
 
     try:
+        add_to_rollups(db, [snapshot_dict])
         db.commit()
     except IntegrityError:
         raise HTTPException(detail='Bad info', status_code=400)
@@ -81,13 +115,65 @@ async def add_meter_snapshot_auto(body: AddAutoMeterSnapshotModel, db: Session =
     return MeterSnapshotModel.from_orm(meter_snapshot)
 
 
+@metrics_router.post("/meter-snapshots/auto/batch/", status_code=201, response_model=MeterSnapshotBatchModel)
+def add_meter_snapshots_auto_batch(body: AddAutoMeterSnapshotBatchModel, db: Session = Depends(get_db),
+                                   secret_key: str = Header(None)):
+    if len(body.snapshots) > MAX_SNAPSHOT_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f'Batch size is limited to {MAX_SNAPSHOT_BATCH_SIZE} snapshots')
+
+    items = [{'index': index, 'success': False, 'id': None, 'detail': None} for index in range(len(body.snapshots))]
+    # Items are free-form dicts, keys of any other type than a string fail the item instead of the whole batch
+    keys = [snapshot.get('secret_key', secret_key) for snapshot in body.snapshots]
+    keys = [key if isinstance(key, str) else None for key in keys]
+    meter_ids = resolve_secret_keys(db, keys)
+
+    accepted_items = []
+    snapshot_dicts = []
+    for item, snapshot, key in zip(items, body.snapshots, keys):
+        snapshot = dict(snapshot)
+        snapshot.pop('secret_key', None)
+        meter_id = meter_ids.get(key)
+        if not meter_id:
+            item['detail'] = 'Wrong secret key'
+            continue
+        try:
+            snapshot_model = AddAutoMeterSnapshotModel(**snapshot)
+        except ValidationError as e:
+            item['detail'] = '; '.join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            continue
+        if snapshot_model.type == MeterType.Electricity and not snapshot_model.electricity:
+            item['detail'] = 'Electricity info is needed'
+            continue
+
+        snapshot_dict = snapshot_model.dict()
+        snapshot_dict['automatic'] = True
+        snapshot_dict['meter_id'] = meter_id
+        accepted_items.append(item)
+        snapshot_dicts.append(snapshot_dict)
+
+    for item, snapshot_id in zip(accepted_items, save_meter_snapshots(db, snapshot_dicts)):
+        if snapshot_id:
+            item['success'] = True
+            item['id'] = snapshot_id
+        else:
+            item['detail'] = 'Bad info'
+
+    created = sum(1 for item in items if item['success'])
+    return {
+        'created': created,
+        'failed': len(items) - created,
+        'items': items
+    }
+
+
 @metrics_router.patch("/meter-snapshots/{meter_snapshot_id}", status_code=200, response_model=MeterSnapshotModel)
-async def patch_meter_snapshot(request: Request, meter_snapshot_id: int, body: ChangeMeterSnapshotModel,
-                               db: Session = Depends(get_db), ):
+def patch_meter_snapshot(request: Request, meter_snapshot_id: int, body: ChangeMeterSnapshotModel,
+                         db: Session = Depends(get_db), ):
     has_permission(request, PermissionSet.MeterSnapshotEdit.value)
     meter_snapshot = db.query(MeterSnapshot).filter_by(id=meter_snapshot_id).first()
 
     previous_type = meter_snapshot.type
+    previous_samples = snapshot_samples(meter_snapshot)
 
     snapshot_dict = body.dict(exclude_unset=True)
     heat_dict = snapshot_dict.pop('heat', {})
@@ -121,13 +207,19 @@ async def patch_meter_snapshot(request: Request, meter_snapshot_id: int, body: C
             meter_snapshot.heat_meter_snapshot = HeatMeterSnapshot(**heat_dict)
 
     db.merge(meter_snapshot)
+    db.flush()
+    refresh_rollups(db, previous_samples + snapshot_samples(meter_snapshot))
     db.commit()
     return MeterSnapshotModel.from_orm(meter_snapshot)
 
 
 @metrics_router.delete("/meter-snapshots/{meter_snapshot_id}/", status_code=200)
-async def remove_meter_snapshot(request: Request, meter_snapshot_id: int, db: Session = Depends(get_db)):
+def remove_meter_snapshot(request: Request, meter_snapshot_id: int, db: Session = Depends(get_db)):
     has_permission(request, PermissionSet.MeterSnapshotEdit.value)
-    db.query(MeterSnapshot).filter_by(id=meter_snapshot_id).delete()
+    meter_snapshot = db.query(MeterSnapshot).filter_by(id=meter_snapshot_id).first()
+    if meter_snapshot:
+        samples = snapshot_samples(meter_snapshot)
+        db.query(MeterSnapshot).filter_by(id=meter_snapshot_id).delete()
+        refresh_rollups(db, samples)
     db.commit()
     return ""
@@ -0,0 +1,67 @@
+from datetime import datetime
+from os import environ
+from typing import List, Tuple
+
+from fastapi import Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from db import get_db
+from meter_statistics import Statistic, meter_statistics, parse_statistics
+from models import PermissionSet
+from models.metrics import Meter
+from permissions import has_permission
+from request_models.metrics_requests import MeterStatisticsModel
+from routes import metrics_router
+from series import SeriesField, to_naive_utc
+
+MAX_STATISTICS_METERS = int(environ.get('MAX_STATISTICS_METERS', 100))
+ALL_STATISTICS = ','.join(statistic.value for statistic in Statistic)
+
+
+def _statistics_range(start: datetime, end: datetime, stats: str) -> Tuple[datetime, datetime, List[Statistic]]:
+    start = to_naive_utc(start)
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    if start >= end:
+        raise HTTPException(detail='"from" must be earlier than "to"', status_code=400)
+    try:
+        statistics = parse_statistics(stats)
+    except ValueError:
+        raise HTTPException(detail=f'stats must be a list of {ALL_STATISTICS}', status_code=400)
+    if not statistics:
+        raise HTTPException(detail='stats must not be empty', status_code=400)
+    return start, end, statistics
+
+
+@metrics_router.get("/meters/statistics/", status_code=200, response_model=List[MeterStatisticsModel],
+                    response_model_exclude_unset=True)
+def get_meters_statistics(request: Request, meter_ids: str, start: datetime = Query(..., alias='from'),
+                          end: datetime = Query(None, alias='to'), field: SeriesField = SeriesField.consumption,
+                          stats: str = ALL_STATISTICS, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    start, end, statistics = _statistics_range(start, end, stats)
+    try:
+        ids = list(dict.fromkeys(int(meter_id) for meter_id in meter_ids.split(',') if meter_id.strip()))
+    except ValueError:
+        raise HTTPException(detail='meter_ids must be a comma separated list of ids', status_code=400)
+    if not ids or len(ids) > MAX_STATISTICS_METERS:
+        raise HTTPException(detail=f'meter_ids must contain 1 to {MAX_STATISTICS_METERS} ids', status_code=400)
+
+    existing_ids = {meter_id for meter_id, in db.query(Meter.id).filter(Meter.id.in_(ids))}
+    ids = [meter_id for meter_id in ids if meter_id in existing_ids]
+    results = meter_statistics(db, ids, start, end, field, statistics) if ids else {}
+    return [{'meter_id': meter_id, 'field': field, 'start': start, 'end': end, **values}
+            for meter_id, values in results.items()]
+
+
+@metrics_router.get("/meters/{meter_id}/statistics/", status_code=200, response_model=MeterStatisticsModel,
+                    response_model_exclude_unset=True)
+def get_meter_statistics(request: Request, meter_id: int, start: datetime = Query(..., alias='from'),
+                         end: datetime = Query(None, alias='to'), field: SeriesField = SeriesField.consumption,
+                         stats: str = ALL_STATISTICS, db: Session = Depends(get_db)):
+    has_permission(request, PermissionSet.MeterSnapshotRead.value)
+    start, end, statistics = _statistics_range(start, end, stats)
+    if not db.query(Meter.id).filter_by(id=meter_id).first():
+        raise HTTPException(detail='Meter does not exist', status_code=404)
+
+    values = meter_statistics(db, [meter_id], start, end, field, statistics)[meter_id]
+    return {'meter_id': meter_id, 'field': field, 'start': start, 'end': end, **values}
@@ -0,0 +1,108 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic.main import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload
+
+from db import Base
+
+
+class SerializationPlan(NamedTuple):
+    table: str
+    columns: List[str]
+    # relationship name -> (is a collection, plan of the related model)
+    relations: Dict[str, tuple]
+
+
+def parse_paths(value: Optional[str]) -> Dict[str, Any]:
+    """Parses a comma separated list of dotted paths, e.g. 'floors.rooms,meters', into a tree of dicts"""
+    tree = {}
+    for path in value.split(',') if value else []:
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _nested_serializer(serializer: Optional[Type[BaseModel]], name: str) -> Optional[Type[BaseModel]]:
+    if serializer is None or name not in serializer.__fields__:
+        return None
+    field_type = serializer.__fields__[name].type_
+    return field_type if isinstance(field_type, type) and issubclass(field_type, BaseModel) else None
+
+
+def build_plan(db_model: Type['Base'], serializer: Optional[Type[BaseModel]], fields: Dict[str, Any],
+               expand: Dict[str, Any], path: str = '') -> SerializationPlan:
+    mapper = inspect(db_model)
+    relationships = mapper.relationships
+    if serializer is None:
+        names = [column.key for column in mapper.column_attrs]
+    else:
+        names = list(serializer.__fields__)
+
+    for name in expand:
+        if name not in relationships or name not in names:
+            raise HTTPException(detail=f'Unknown expand field {path}{name}', status_code=400)
+    for name in fields:
+        if name not in names:
+            raise HTTPException(detail=f'Unknown field {path}{name}', status_code=400)
+        if name in relationships and name not in expand:
+            raise HTTPException(detail=f'{path}{name} must be expanded to select its fields', status_code=400)
+
+    # Without explicitly selected columns a level returns all of them
+    selected = [name for name in fields if name not in relationships]
+    columns = [name for name in names if name not in relationships and (not selected or name in selected)]
+    relations = {}
+    for name in names:
+        if name in expand:
+            relationship = relationships[name]
+            relations[name] = (relationship.uselist, build_plan(
+                relationship.mapper.class_, _nested_serializer(serializer, name), fields.get(name, {}),
+                expand[name], f'{path}{name}.'
+            ))
+    return SerializationPlan(table=db_model.__tablename__, columns=columns, relations=relations)
+
+
+def plan_tables(plan: SerializationPlan) -> Set[str]:
+    tables = {plan.table}
+    for _, nested_plan in plan.relations.values():
+        tables |= plan_tables(nested_plan)
+    return tables
+
+
+def loader_options(db_model: Type['Base'], plan: SerializationPlan, parent=None) -> List[Any]:
+    """
+    Eager loads every expanded relationship so a page costs one query per relationship level instead of one per row.
+    Collections are loaded with a separate IN query, single objects are joined into the query of their parent.
+    """
+    options = []
+    for name, (uselist, nested_plan) in plan.relations.items():
+        attribute = getattr(db_model, name)
+        strategy = 'selectinload' if uselist else 'joinedload'
+        if parent is None:
+            loader = (selectinload if uselist else joinedload)(attribute)
+        else:
+            loader = getattr(parent, strategy)(attribute)
+        nested_options = loader_options(attribute.property.mapper.class_, nested_plan, loader)
+        options.extend(nested_options or [loader])
+    return options
+
+
+@lru_cache(maxsize=256)
+def get_plan(db_model: Type['Base'], serializer: Optional[Type[BaseModel]], fields: Optional[str],
+             expand: Optional[str]) -> Tuple[SerializationPlan, List[Any]]:
+    plan = build_plan(db_model, serializer, parse_paths(fields), parse_paths(expand))
+    return plan, loader_options(db_model, plan)
+
+
+def serialize(obj: Any, plan: SerializationPlan) -> Optional[Dict[str, Any]]:
+    if obj is None:
+        return None
+    result = {name: getattr(obj, name) for name in plan.columns}
+    for name, (uselist, nested_plan) in plan.relations.items():
+        value = getattr(obj, name)
+        result[name] = [serialize(item, nested_plan) for item in value] if uselist else serialize(value, nested_plan)
+    return result
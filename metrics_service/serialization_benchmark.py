@@ -0,0 +1,76 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from models.metrics import MeterSnapshot, HeatMeterSnapshot, MeterType
+from request_models import create_pagination_model
+from request_models.metrics_requests import MeterSnapshotModel
+from responses import FastJSONResponse
+from serialization import get_plan, serialize
+
+MeterSnapshotPageModel = create_pagination_model(MeterSnapshotModel)
+PAGE_INFO = {'total_size': 1000000, 'total_size_kind': 'estimated', 'page_number': 1, 'next_cursor': None}
+
+
+def make_snapshots(count: int) -> List[MeterSnapshot]:
+    started = datetime(2021, 1, 1)
+    snapshots = []
+    for i in range(count):
+        snapshot = MeterSnapshot(id=i, meter_id=1, type=MeterType.Heat, consumption=Decimal('1234.567') + i,
+                                 automatic=True, creation_date=started + timedelta(minutes=i),
+                                 current_time=started + timedelta(minutes=i), uptime=Decimal(i))
+        snapshot.heat_meter_snapshot = HeatMeterSnapshot(
+            id=i, snapshot_id=i, incoming_temperature=Decimal('71.25'), outgoing_temperature=Decimal('48.5'),
+            incoming_pump_usage=Decimal('1.5'), outgoing_pump_usage=Decimal('1.25'),
+            outside_temperature=Decimal('-3.5'), inside_temperature=Decimal('21.5'),
+            incoming_water_pressure=Decimal('4.2'), outgoing_water_pressure=Decimal('3.9'),
+            heat_consumption=Decimal('12.75'))
+        snapshot.electricity_meter_snapshot = None
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def pydantic_page(snapshots: List[MeterSnapshot]) -> bytes:
+    # What paginate and FastAPI did before: from_orm, validation against response_model, jsonable_encoder, json
+    items = [MeterSnapshotModel.from_orm(snapshot) for snapshot in snapshots]
+    page = MeterSnapshotPageModel(**PAGE_INFO, page_size=len(items), items=items)
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def fast_page(snapshots: List[MeterSnapshot]) -> bytes:
+    plan, _ = get_plan(MeterSnapshot, MeterSnapshotModel, None, 'heat_meter_snapshot,electricity_meter_snapshot')
+    items = [serialize(snapshot, plan) for snapshot in snapshots]
+    return FastJSONResponse({**PAGE_INFO, 'page_size': len(items), 'items': items}).body
+
+
+def pages_per_second(render: Callable[[List[MeterSnapshot]], bytes], snapshots: List[MeterSnapshot],
+                     duration: float) -> float:
+    pages = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        render(snapshots)
+        pages += 1
+    return pages / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serialization throughput of a meter snapshot page')
+    parser.add_argument('--page-sizes', default='10,100,1000')
+    parser.add_argument('--duration', type=float, default=2, help='Seconds to measure each variant')
+    args = parser.parse_args()
+
+    for page_size in [int(size) for size in args.page_sizes.split(',')]:
+        snapshots = make_snapshots(page_size)
+        slow = pages_per_second(pydantic_page, snapshots, args.duration)
+        fast = pages_per_second(fast_page, snapshots, args.duration)
+        print(f'page_size {page_size}: pydantic {slow:.1f} pages/s ({slow * page_size:.0f} rows/s), '
+              f'fast path {fast:.1f} pages/s ({fast * page_size:.0f} rows/s), {fast / slow:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import enum
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple, Type
+
+import numpy as np
+from sqlalchemy import text, Numeric
+from sqlalchemy.orm import Session
+
+from db import Base
+from models.metrics import MeterSnapshot, HeatMeterSnapshot, ElectricityMeterSnapshot
+
+
+class ConsumptionBucket(str, enum.Enum):
+    Minutes15 = '15m'
+    Hour = 'hour'
+    Day = 'day'
+    Month = 'month'
+
+
+BUCKET_EXPRESSIONS = {
+    ConsumptionBucket.Minutes15: "to_timestamp(floor(extract(epoch FROM {time}) / 900) * 900) AT TIME ZONE 'UTC'",
+    ConsumptionBucket.Hour: "date_trunc('hour', {time})",
+    ConsumptionBucket.Day: "date_trunc('day', {time})",
+    ConsumptionBucket.Month: "date_trunc('month', {time})",
+}
+
+BUCKET_INTERVALS = {
+    ConsumptionBucket.Minutes15: '15 minutes',
+    ConsumptionBucket.Hour: '1 hour',
+    ConsumptionBucket.Day: '1 day',
+    ConsumptionBucket.Month: '1 month',
+}
+
+BUCKET_DURATIONS = {
+    ConsumptionBucket.Minutes15: timedelta(minutes=15),
+    ConsumptionBucket.Hour: timedelta(hours=1),
+    ConsumptionBucket.Day: timedelta(days=1),
+    ConsumptionBucket.Month: timedelta(days=28),
+}
+
+# Every snapshot is differenced against the previous one, including the last one before the requested range, so the
+# consumption of the first bucket is complete. A negative difference means the counter was reset or replaced, in which
+# case the new reading itself is the consumption since the reset. Buckets without snapshots are still returned with
+# zero samples; consumption accumulated over such a gap is attributed to the bucket of the next snapshot.
+# Manual snapshots have no current_time, so snapshots are placed at coalesce(current_time, creation_date), the same
+# time the rollups bucket them by, and both endpoints agree on the consumption of a range. The expression is indexed
+# together with meter_id.
+SNAPSHOT_TIME = 'coalesce("current_time", creation_date)'
+CONSUMPTION_QUERY = '''
+    WITH samples AS (
+        SELECT {time} AS time,
+               consumption - lag(consumption) OVER (ORDER BY {time}, id) AS difference,
+               consumption
+        FROM meter_snapshots
+        WHERE meter_id = :meter_id
+          AND {time} < :end
+          AND {time} >= coalesce(
+              (SELECT max({time}) FROM meter_snapshots WHERE meter_id = :meter_id AND {time} < :start),
+              :start
+          )
+    ), deltas AS (
+        SELECT {sample_bucket} AS bucket,
+               CASE WHEN difference < 0 THEN consumption ELSE coalesce(difference, 0) END AS delta
+        FROM samples
+        WHERE time >= :start
+    )
+    SELECT buckets.bucket, coalesce(sum(deltas.delta), 0) AS consumption, count(deltas.bucket) AS samples
+    FROM generate_series({start_bucket}, CAST(:end AS TIMESTAMP) - interval '1 microsecond',
+                         interval '{interval}') AS buckets (bucket)
+    LEFT JOIN deltas ON deltas.bucket = buckets.bucket
+    GROUP BY buckets.bucket
+    ORDER BY buckets.bucket
+'''
+
+
+SNAPSHOT_DETAIL_JOINS = {
+    'heat': 'JOIN heat_meter_snapshots AS heat ON heat.snapshot_id = snapshots.id',
+    'electricity': 'JOIN electricity_meter_snapshots AS electricity ON electricity.snapshot_id = snapshots.id',
+}
+
+
+def _numeric_columns(db_model: Type['Base'], table_alias: str, prefix: str = '') -> Dict[str, Tuple[str, str]]:
+    return {f'{prefix}{column.name}': (table_alias, f'{table_alias}."{column.name}"')
+            for column in db_model.__table__.columns if isinstance(column.type, Numeric)}
+
+
+# Numeric snapshot fields a series can be built from, mapped to the table alias and the SQL expression reading them
+SERIES_COLUMNS = {
+    **_numeric_columns(MeterSnapshot, 'snapshots'),
+    **_numeric_columns(HeatMeterSnapshot, 'heat', prefix='heat_'),
+    **_numeric_columns(ElectricityMeterSnapshot, 'electricity', prefix='electricity_'),
+}
+SeriesField = enum.Enum('SeriesField', {name: name for name in SERIES_COLUMNS}, type=str)
+
+
+def series_source(field: SeriesField) -> Tuple[str, str]:
+    """Returns the FROM clause over meter_snapshots (aliased as snapshots) and the expression of the field"""
+    table_alias, expression = SERIES_COLUMNS[field.value]
+    join = SNAPSHOT_DETAIL_JOINS.get(table_alias, '')
+    return f'meter_snapshots AS snapshots {join}', expression
+
+
+def to_naive_utc(time: datetime) -> datetime:
+    return time.astimezone(timezone.utc).replace(tzinfo=None) if time.tzinfo else time
+
+
+def bucket_count(start: datetime, end: datetime, bucket: ConsumptionBucket) -> int:
+    return int((end - start) / BUCKET_DURATIONS[bucket]) + 1
+
+
+def consumption_series(db: Session, meter_id: int, start: datetime, end: datetime,
+                       bucket: ConsumptionBucket) -> List[Dict[str, Any]]:
+    query = CONSUMPTION_QUERY.format(
+        time=SNAPSHOT_TIME,
+        sample_bucket=BUCKET_EXPRESSIONS[bucket].format(time='time'),
+        start_bucket=BUCKET_EXPRESSIONS[bucket].format(time='CAST(:start AS TIMESTAMP)'),
+        interval=BUCKET_INTERVALS[bucket],
+    )
+    result = db.execute(text(query), {'meter_id': meter_id, 'start': start, 'end': end})
+    return [{'bucket': row.bucket, 'consumption': row.consumption, 'samples': row.samples} for row in result]
+
+
+# Samples are placed at the snapshot time of the consumption series, so manual snapshots are part of the series too
+SERIES_SAMPLES = '''
+    SELECT {time} AS time, {value} AS value
+    FROM {source}
+    WHERE snapshots.meter_id = :meter_id AND {value} IS NOT NULL AND {condition}
+'''
+
+# Both arrays are built by Postgres, so a long series arrives as two values rather than a row per sample
+SERIES_QUERY = '''
+    WITH samples AS ({samples})
+    SELECT array_agg(CAST(extract(epoch FROM time) AS float8) ORDER BY time),
+           array_agg(CAST(value AS float8) ORDER BY time)
+    FROM samples
+'''
+
+
+def to_epoch(time: datetime) -> float:
+    return time.replace(tzinfo=timezone.utc).timestamp() if time.tzinfo is None else time.timestamp()
+
+
+def load_series(db: Session, meter_id: int, start: datetime, end: datetime, field: SeriesField,
+                with_neighbours: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the epoch seconds and the values of a meter field within [start, end), ordered by time. With neighbours
+    the last sample before and the first sample after the range are included as well, to interpolate up to its edges.
+    """
+    source, value = series_source(field)
+    samples = [SERIES_SAMPLES.format(source=source, value=value, time=SNAPSHOT_TIME,
+                                     condition=f'{SNAPSHOT_TIME} >= :start AND {SNAPSHOT_TIME} < :end')]
+    if with_neighbours:
+        samples.insert(0, SERIES_SAMPLES.format(source=source, value=value, time=SNAPSHOT_TIME,
+                                                condition=f'{SNAPSHOT_TIME} < :start') +
+                       f'ORDER BY {SNAPSHOT_TIME} DESC LIMIT 1')
+        samples.append(SERIES_SAMPLES.format(source=source, value=value, time=SNAPSHOT_TIME,
+                                             condition=f'{SNAPSHOT_TIME} >= :end') +
+                       f'ORDER BY {SNAPSHOT_TIME} LIMIT 1')
+    query = SERIES_QUERY.format(samples=' UNION ALL '.join(f'({sample})' for sample in samples))
+    times, values = db.execute(text(query), {'meter_id': meter_id, 'start': start, 'end': end}).first()
+    return np.array(times or [], dtype=np.float64), np.array(values or [], dtype=np.float64)
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime
+from os import environ
+from typing import Dict, Iterable, List
+
+import requests
+from pydantic import BaseModel
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from auth_api import auth_client, get_users, SERVER_API_KEY
+from db import db as db_session
+from models.location import UserReplica
+from request_models.location_requests import ContactInfoModel, UserModel
+
+USER_SYNC_INTERVAL = float(environ.get('USER_SYNC_INTERVAL', 30))
+USER_SYNC_PAGE_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class UserChangeModel(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    contact_infos: List[ContactInfoModel]
+    updated: datetime
+
+
+def _fetch_user_changes(since: datetime, since_id: int) -> List[UserChangeModel]:
+    params = {'limit': USER_SYNC_PAGE_SIZE}
+    if since:
+        params.update({'since': since.isoformat(), 'since_id': since_id})
+    response = auth_client.get('/users/changes/', params=params, headers={'Server-Api-Key': SERVER_API_KEY})
+    response.raise_for_status()
+    return [UserChangeModel(**user) for user in response.json()]
+
+
+def upsert_users(db: Session, users: List[UserChangeModel]):
+    statement = insert(UserReplica.__table__).values([user.dict() for user in users])
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserReplica.id],
+        set_={column: statement.excluded[column]
+              for column in ('first_name', 'last_name', 'email', 'contact_infos', 'updated')}
+    )
+    db.execute(statement)
+
+
+def sync_users(db: Session) -> int:
+    """Pulls the users changed since the newest replicated change; returns the number of users updated"""
+    latest = db.query(UserReplica.updated, UserReplica.id) \
+        .order_by(UserReplica.updated.desc(), UserReplica.id.desc()).first()
+    since, since_id = latest if latest else (None, 0)
+
+    synced = 0
+    while True:
+        users = _fetch_user_changes(since, since_id)
+        if not users:
+            break
+        upsert_users(db, users)
+        db.commit()
+        synced += len(users)
+        since, since_id = users[-1].updated, users[-1].id
+        if len(users) < USER_SYNC_PAGE_SIZE:
+            break
+    return synced
+
+
+def _sync_users():
+    db = db_session()
+    try:
+        sync_users(db)
+    finally:
+        db.close()
+
+
+async def maintain_user_directory():
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, _sync_users)
+        except Exception:
+            logger.exception('Failed to sync the user directory')
+        await asyncio.sleep(USER_SYNC_INTERVAL)
+
+
+def get_directory_users(db: Session, user_ids: Iterable[int]) -> Dict[int, UserModel]:
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    users = {
+        user.id: UserModel(id=user.id, first_name=user.first_name, last_name=user.last_name, email=user.email,
+                           contact_infos=user.contact_infos)
+        for user in db.query(UserReplica).filter(UserReplica.id.in_(user_ids))
+    }
+
+    # Users created after the last sync are not replicated yet
+    missing_ids = user_ids - users.keys()
+    if missing_ids:
+        try:
+            users.update(get_users(missing_ids))
+        except requests.RequestException:
+            logger.warning('Failed to fetch users missing from the directory', exc_info=True)
+    return users
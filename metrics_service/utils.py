@@ -1,23 +1,76 @@
-from typing import Type
+import base64
+import binascii
+import enum
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Type, List, Any, Dict, Tuple, Optional, Set
 
-from fastapi import Request
+from fastapi import Request, HTTPException
 from pydantic.main import BaseModel
-from sqlalchemy import desc, asc
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, asc, and_, or_, false
+from sqlalchemy.orm import Query, Session
+from starlette.responses import Response
 
+from counts import CountMode, count_rows
 from db import Base
+from responses import FastJSONResponse
+from response_cache import cached_response
+from serialization import get_plan, plan_tables, serialize
 
 
-def apply_filtering(db: Session, db_model: Type['Base'], request: Request):
-    query = db.query(db_model)
+def _cursor_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
 
-    query_params = dict(request.query_params)
-    page_number = int(query_params.pop('page_number', 1))
-    page_size = int(query_params.pop('page_size', 10))
 
-    order_by = query_params.pop('order_by', None)
-    order_by = [s.strip() for s in order_by.split(',')] if order_by else []
-    for filter_arg, value in query_params.items():
+def encode_cursor(order_by: List[str], values: List[Any]) -> str:
+    token = json.dumps({'o': order_by, 'v': [_cursor_value(value) for value in values]})
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+
+def decode_cursor(cursor: str, order_by: List[str]) -> List[Any]:
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values = token['v']
+        valid = token['o'] == order_by and len(values) == len(order_by) + 1
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(detail='Invalid cursor', status_code=400)
+    return values
+
+
+def _after(column, descending: bool, value: Any):
+    # Postgres sorts NULLs last in ascending and first in descending order
+    if descending:
+        if value is None:
+            return column.isnot(None), column.is_(None)
+        return column < value, column == value
+    if value is None:
+        return false(), column.is_(None)
+    if not column.expression.nullable:
+        return column > value, column == value
+    return or_(column > value, column.is_(None)), column == value
+
+
+def _keyset_filter(columns: List[Tuple[Any, bool]], values: List[Any]):
+    conditions = []
+    equal_so_far = []
+    for (column, descending), value in zip(columns, values):
+        after, equal = _after(column, descending, value)
+        conditions.append(and_(*equal_so_far, after))
+        equal_so_far.append(equal)
+    return or_(*conditions)
+
+
+def filter_query(query: Query, db_model: Type['Base'], filters: Dict[str, str]) -> Query:
+    for filter_arg, value in filters.items():
         filter_arg = filter_arg.split('__')
         if len(filter_arg) > 1:
             operator = filter_arg[1]
@@ -41,31 +94,127 @@ def apply_filtering(db: Session, db_model: Type['Base'], request: Request):
         if operator == 'in':
             value = [s.strip() for s in value.split(',')]
             query = query.filter(getattr(db_model, filter_arg).in_(value))
+    return query
+
 
-    ordering_params = []
+def get_ordering_columns(db_model: Type['Base'], order_by: List[str]) -> List[Tuple[Any, bool]]:
+    ordering_columns = []
     for ordering in order_by:
         sign = ordering[0]
         if sign == '-':
-            ordering_params.append(desc(getattr(db_model, ordering[1:])))
+            ordering_columns.append((getattr(db_model, ordering[1:]), True))
         else:
-            ordering_params.append(asc(getattr(db_model, ordering)))
+            ordering_columns.append((getattr(db_model, ordering), False))
+    return ordering_columns
 
-    query = query.order_by(*ordering_params)
-    count = query.count()
-    query = query.limit(page_size).offset((page_number - 1) * page_size)
 
-    result_models = query.all()
+def apply_filtering(db: Session, db_model: Type['Base'], request: Request, count_mode: CountMode = CountMode.Exact,
+                    options: Optional[List[Any]] = None,
+                    columns: Optional[List[str]] = None) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Returns ORM objects, or plain rows with the given columns (plus the ones the ordering needs) if columns are set
+    """
+    query = db.query(db_model)
 
-    return result_models, count, page_number
+    query_params = dict(request.query_params)
+    page_number = int(query_params.pop('page_number', 1))
+    page_size = int(query_params.pop('page_size', 10))
+    cursor = query_params.pop('cursor', None)
+    with_count = query_params.pop('with_count', 'false').lower() == 'true'
+    query_params.pop('fields', None)
+    query_params.pop('expand', None)
+    try:
+        count_mode = CountMode(query_params.pop('count', count_mode))
+    except ValueError:
+        raise HTTPException(detail=f'count must be one of {", ".join(mode.value for mode in CountMode)}',
+                            status_code=400)
 
+    order_by = query_params.pop('order_by', None)
+    order_by = [s.strip() for s in order_by.split(',')] if order_by else []
+    query = filter_query(query, db_model, query_params)
+    ordering_columns = get_ordering_columns(db_model, order_by)
 
-def paginate(db: Session, db_model: Type['Base'], serializer: Type['BaseModel'], request: Request):
-    result_models, count, page_number = apply_filtering(db, db_model, request)
+    if columns:
+        keys = list(dict.fromkeys([*columns, 'id', *[column.key for column, _ in ordering_columns]]))
+        query = query.with_entities(*[getattr(db_model, key) for key in keys])
 
-    items = [serializer.from_orm(obj) for obj in result_models]
-    return {
+    if cursor is None:
+        query = query.order_by(*[desc(column) if descending else asc(column)
+                                 for column, descending in ordering_columns])
+        count, count_kind = count_rows(db, query, count_mode, db_model.__tablename__, query_params)
+        query = query.limit(page_size).offset((page_number - 1) * page_size)
+
+        result_models = query.options(*options or []).all()
+        return result_models, {
+            'total_size': count,
+            'total_size_kind': count_kind,
+            'page_number': page_number,
+            'next_cursor': None
+        }
+
+    # Keyset mode: the id breaks ties so every row has a unique position in the ordering
+    ordering_columns.append((db_model.id, ordering_columns[-1][1] if ordering_columns else False))
+    count, count_kind = None, None
+    if with_count:
+        count, count_kind = count_rows(db, query, count_mode, db_model.__tablename__, query_params)
+    if cursor:
+        query = query.filter(_keyset_filter(ordering_columns, decode_cursor(cursor, order_by)))
+    query = query.order_by(*[desc(column) if descending else asc(column) for column, descending in ordering_columns])
+
+    result_models = query.options(*options or []).limit(page_size + 1).all()
+    next_cursor = None
+    if len(result_models) > page_size:
+        result_models = result_models[:page_size]
+        last = result_models[-1]
+        next_cursor = encode_cursor(order_by, [getattr(last, column.key) for column, _ in ordering_columns])
+    return result_models, {
         'total_size': count,
-        'page_number': page_number,
+        'total_size_kind': count_kind,
+        'page_number': None,
+        'next_cursor': next_cursor
+    }
+
+
+def make_page(page_info: Dict[str, Any], items: List[Any]) -> Dict[str, Any]:
+    return {
+        **page_info,
         'page_size': len(items),
         'items': items
     }
+
+
+def get_page(db: Session, db_model: Type['Base'], serializer: Type['BaseModel'], request: Request,
+             count_mode: CountMode = CountMode.Exact, default_expand: Optional[str] = None,
+             fields: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Relationships are only serialized when listed in ?expand= (or default_expand), e.g. expand=floors.rooms,meters.
+    ?fields= selects the columns of the top level and, with dotted paths, of the expanded relationships. Routes adding
+    fields of their own pass the fields to read from the database instead.
+    """
+    plan, options = get_plan(db_model, serializer, request.query_params.get('fields') if fields is None else fields,
+                             request.query_params.get('expand', default_expand))
+    # Pages without relationships are read as plain rows, skipping the ORM identity map and object construction
+    result_models, page_info = apply_filtering(db, db_model, request, count_mode, options,
+                                               columns=None if plan.relations else plan.columns)
+
+    items = [serialize(obj, plan) for obj in result_models]
+    return make_page(page_info, items)
+
+
+def page_tables(db_model: Type['Base'], serializer: Type['BaseModel'], request: Request,
+                default_expand: Optional[str] = None, fields: Optional[str] = None) -> Set[str]:
+    plan, _ = get_plan(db_model, serializer, request.query_params.get('fields') if fields is None else fields,
+                       request.query_params.get('expand', default_expand))
+    return plan_tables(plan)
+
+
+def paginate(db: Session, db_model: Type['Base'], serializer: Type['BaseModel'], request: Request,
+             count_mode: CountMode = CountMode.Exact, default_expand: Optional[str] = None,
+             cached: bool = False) -> Response:
+    # Items may leave out fields the response model requires, so it is not validated against it
+    def build():
+        return FastJSONResponse(get_page(db, db_model, serializer, request, count_mode, default_expand))
+
+    if cached:
+        return cached_response(request, page_tables(db_model, serializer, request, default_expand), build)
+    return build()